@@ -18,6 +18,7 @@ CREATE TABLE IF NOT EXISTS document_chunks (
     chunk_text TEXT NOT NULL,
     source_file TEXT,
     chunk_index INTEGER,
+    doc_type TEXT,
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -53,6 +53,7 @@ def main():
             chunk_text TEXT NOT NULL,
             source_file TEXT,
             chunk_index INTEGER,
+            doc_type TEXT,
             created_at DATETIME DEFAULT CURRENT_TIMESTAMP
         );
 
@@ -65,10 +66,16 @@ def main():
         );
     """)
 
-    # Clear existing data (fresh export)
+    # Databases created before doc_type existed (schema.sql / older exports)
+    columns = {row[1] for row in cur.execute("PRAGMA table_info(document_chunks)")}
+    if "doc_type" not in columns:
+        cur.execute("ALTER TABLE document_chunks ADD COLUMN doc_type TEXT")
+        conn.commit()
+
+    # Clear existing data (fresh export). Not committed until the new rows are in,
+    # so readers such as the /search endpoint never see a half-written export.
     cur.execute("DELETE FROM embeddings")
     cur.execute("DELETE FROM document_chunks")
-    conn.commit()
     print("[INFO] Cleared existing chunks and embeddings")
 
     # Extract documents and their embeddings from the FAISS store
@@ -89,12 +96,13 @@ def main():
 
         chunk_text = doc.page_content
         source_file = doc.metadata.get("source", doc.metadata.get("filename", "unknown"))
+        doc_type = doc.metadata.get("doc_type")
         embedding_vec = all_vectors[i].tolist()
 
         # Insert chunk
         cur.execute(
-            "INSERT INTO document_chunks (chunk_text, source_file, chunk_index) VALUES (?, ?, ?)",
-            (chunk_text, source_file, i),
+            "INSERT INTO document_chunks (chunk_text, source_file, chunk_index, doc_type) VALUES (?, ?, ?, ?)",
+            (chunk_text, source_file, i, doc_type),
         )
         chunk_id = cur.lastrowid
 
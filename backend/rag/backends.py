@@ -0,0 +1,284 @@
+"""
+Backend selection for chatbot.py / ingest_docs.py
+
+By default the chatbot talks to Ollama and Gmail. For load testing and CI the
+real services can be swapped for deterministic stand-ins:
+
+    LLM_BACKEND=fake         FakeChatModel (tool-calling, streaming, configurable speed)
+    EMBEDDING_BACKEND=fake   FakeEmbeddings (hash-based bag of words)
+    GMAIL_BACKEND=fake       search_gmail over a synthetic mailbox
+
+Tuning knobs for the fakes (all optional):
+    FAKE_LLM_LATENCY_MS, FAKE_LLM_TOKENS_PER_SEC, FAKE_LLM_ANSWER_TOKENS,
+    FAKE_EMBEDDING_DIM, FAKE_EMBEDDING_LATENCY_MS,
+    FAKE_GMAIL_MAILBOX_SIZE, FAKE_GMAIL_LATENCY_MS
+
+Note: an index built with the fake embedder only works with the fake embedder,
+so run ingest_docs.py with the same EMBEDDING_BACKEND as the server.
+"""
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import time
+import uuid
+from typing import Iterator, List
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.tools import tool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+
+def _env_float(name, default):
+    return float(os.getenv(name, default))
+
+
+def _digest(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+# ── Chat model ───────────────────────────────────────────────────────────
+_VOCAB = (
+    "invoice vendor payment policy review customer total amount due status "
+    "approval escalation finance team overdue pending summary insight action "
+    "recommend priority trend feedback complaint resolved update report"
+).split()
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Deterministic chat model that mimics the tool-calling flow of chat_node.
+
+    - When chat_node forces a tool ("You MUST call rag_tool ..."), it emits that tool call.
+    - After a tool result, it answers with text derived from the tool output.
+    - For analyze_email's JSON prompt, it returns a well-formed JSON object.
+    Latency is latency_ms before the first token, then tokens_per_second.
+    """
+
+    latency_ms: float = 200.0
+    tokens_per_second: float = 50.0
+    answer_tokens: int = 60
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+    def _plan(self, messages: List[BaseMessage], tools):
+        """Return (tool_call, text) for the given conversation."""
+        last = messages[-1]
+        tool_names = {t["function"]["name"] for t in tools or []}
+
+        if isinstance(last, ToolMessage):
+            return None, self._answer(f"{last.name}:{last.content}")
+
+        prompt = last.content if isinstance(last.content, str) else str(last.content)
+
+        if not tool_names and "Return ONLY a JSON object" in prompt:
+            return None, self._email_json(prompt)
+
+        system = next((m.content for m in messages if isinstance(m, SystemMessage)), "")
+        for name in ("rag_tool", "gmail_intelligence_tool"):
+            if name in tool_names and f"You MUST call {name}" in system:
+                query = prompt.lower() if isinstance(last, HumanMessage) else ""
+                call = {"name": name, "args": {"query": query}, "id": f"call_{uuid.uuid4().hex[:12]}"}
+                return call, ""
+
+        return None, self._answer(prompt)
+
+    def _answer(self, seed: str) -> str:
+        rng = random.Random(_digest(seed))
+        words = [rng.choice(_VOCAB) for _ in range(self.answer_tokens)]
+        return "**Summary:** " + " ".join(words) + "."
+
+    @staticmethod
+    def _email_json(prompt: str) -> str:
+        subject = re.search(r"Subject: (.*)", prompt)
+        subject = subject.group(1).lower() if subject else ""
+        email_type = "other"
+        for label, words in [("invoice", ("invoice", "payment")), ("networking", ("connect", "invitation")),
+                             ("event", ("webinar", "event")), ("promotional", ("sale", "offer"))]:
+            if any(w in subject for w in words):
+                email_type = label
+                break
+        return json.dumps({
+            "type": email_type,
+            "suggested_action": "review",
+            "vendor": "N/A",
+            "amount": "N/A",
+            "due_date": "N/A",
+            "sentiment": "neutral",
+        })
+
+    def _tokens(self, text: str):
+        return [w + " " for w in text.split(" ")]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        tool_call, text = self._plan(messages, kwargs.get("tools"))
+        n_tokens = 1 if tool_call else len(self._tokens(text))
+        time.sleep(self.latency_ms / 1000 + n_tokens / self.tokens_per_second)
+        if tool_call:
+            message = AIMessage(content="", tool_calls=[tool_call])
+        else:
+            message = AIMessage(content=text)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        tool_call, text = self._plan(messages, kwargs.get("tools"))
+        time.sleep(self.latency_ms / 1000)
+        if tool_call:
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content="",
+                tool_call_chunks=[{
+                    "name": tool_call["name"],
+                    "args": json.dumps(tool_call["args"]),
+                    "id": tool_call["id"],
+                    "index": 0,
+                }],
+            ))
+            return
+        for token in self._tokens(text):
+            time.sleep(1 / self.tokens_per_second)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+
+# ── Embeddings ───────────────────────────────────────────────────────────
+class FakeEmbeddings(Embeddings):
+    """Signed feature hashing of lowercase words; texts sharing words get similar vectors."""
+
+    def __init__(self, dim: int = 384, latency_ms: float = 0.0):
+        self.dim = dim
+        self.latency_ms = latency_ms
+
+    def _embed(self, text: str) -> List[float]:
+        vec = [0.0] * self.dim
+        for word in re.findall(r"[a-z0-9]+", text.lower()):
+            h = int.from_bytes(_digest(word)[:8], "little")
+            vec[h % self.dim] += 1.0 if (h >> 63) & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+        return [v / norm for v in vec]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+# ── Gmail ────────────────────────────────────────────────────────────────
+_SENDERS = [
+    "Laura Mendes <laura@orion-supplies.com>",
+    "Rahul Mehta <rahul.mehta@company.com>",
+    "Anika Shah <anika.shah@company.com>",
+    "Ommi Patel <ommi@nexora.io>",
+    "LinkedIn <invitations@linkedin.com>",
+    "Cloudscape Events <events@cloudscape.dev>",
+    "ShopMart <deals@shopmart.com>",
+]
+_SUBJECTS = [
+    "Invoice INV-{n} due in 15 days",
+    "Payment reminder for INV-{n}",
+    "Invitation to connect",
+    "Webinar: Scaling AP automation (event #{n})",
+    "Weekend sale: {n}% off",
+    "Re: Support ticket #{n}",
+    "Meeting notes and next steps",
+]
+
+
+def build_mailbox(size: int, seed: int = 7):
+    """Deterministic synthetic inbox, newest message first."""
+    rng = random.Random(seed)
+    mailbox = []
+    for i in range(size):
+        subject = rng.choice(_SUBJECTS).format(n=1000 + i)
+        sender = rng.choice(_SENDERS)
+        body = (
+            f"Hello, this is regarding '{subject}'. "
+            + " ".join(rng.choice(_VOCAB) for _ in range(40))
+        )
+        mailbox.append({
+            "id": f"msg{i:05d}",
+            "threadId": f"thr{i // 3:05d}",
+            "subject": subject,
+            "sender": sender,
+            "snippet": body[:100],
+            "body": body,
+        })
+    return mailbox
+
+
+def search_mailbox(mailbox, query: str, max_results: int = 10):
+    """Tiny subset of Gmail search syntax: from:, subject:(a OR b), bare terms (ANDed)."""
+    filters = []
+    for m in re.finditer(r"(from|subject):(\([^)]*\)|\S+)|(\S+)", query.lower()):
+        field, value, term = m.groups()
+        if term == "in:inbox":
+            continue
+        if term:
+            filters.append(lambda e, t=term: t in (e["subject"] + " " + e["sender"] + " " + e["body"]).lower())
+            continue
+        options = [o for o in re.split(r"\s+or\s+", value.strip("()")) if o]
+        key = "sender" if field == "from" else "subject"
+        filters.append(lambda e, k=key, opts=options: any(o in e[k].lower() for o in opts))
+    return [e for e in mailbox if all(f(e) for f in filters)][:max_results]
+
+
+def make_fake_gmail_tools(mailbox_size: int = 200, latency_ms: float = 50.0):
+    mailbox = build_mailbox(mailbox_size)
+
+    @tool("search_gmail")
+    def fake_search_gmail(query: str, max_results: int = 10):
+        """Search the synthetic mailbox with Gmail query syntax."""
+        if latency_ms:
+            time.sleep(latency_ms / 1000)
+        return search_mailbox(mailbox, query, max_results)
+
+    return [fake_search_gmail]
+
+
+# ── Selection ────────────────────────────────────────────────────────────
+def get_chat_model():
+    if os.getenv("LLM_BACKEND", "ollama") == "fake":
+        print("[Backends] Using fake chat model")
+        return FakeChatModel(
+            latency_ms=_env_float("FAKE_LLM_LATENCY_MS", 200),
+            tokens_per_second=_env_float("FAKE_LLM_TOKENS_PER_SEC", 50),
+            answer_tokens=int(_env_float("FAKE_LLM_ANSWER_TOKENS", 60)),
+        )
+    from langchain_ollama import ChatOllama
+    return ChatOllama(model=os.getenv("OLLAMA_CHAT_MODEL", "qwen2.5:3b"))
+
+
+def get_embeddings():
+    if os.getenv("EMBEDDING_BACKEND", "ollama") == "fake":
+        print("[Backends] Using fake embeddings")
+        return FakeEmbeddings(
+            dim=int(_env_float("FAKE_EMBEDDING_DIM", 384)),
+            latency_ms=_env_float("FAKE_EMBEDDING_LATENCY_MS", 0),
+        )
+    from langchain_ollama import OllamaEmbeddings
+    return OllamaEmbeddings(model=os.getenv("OLLAMA_EMBEDDING_MODEL", "qwen3-embedding:4b"))
+
+
+def get_gmail_tools():
+    if os.getenv("GMAIL_BACKEND", "gmail") == "fake":
+        print("[Backends] Using fake Gmail mailbox")
+        return make_fake_gmail_tools(
+            mailbox_size=int(_env_float("FAKE_GMAIL_MAILBOX_SIZE", 200)),
+            latency_ms=_env_float("FAKE_GMAIL_LATENCY_MS", 50),
+        )
+    from langchain_google_community import GmailToolkit
+    return GmailToolkit().get_tools()
@@ -0,0 +1,171 @@
+"""
+Routing benchmark: precompiled KeywordRouter vs the old per-message substring scans.
+
+Runs both implementations over a labelled set of queries, reports accuracy
+against the labels and the average time per routed message.
+
+Usage:
+    python bench_routing.py [iterations]
+"""
+import re
+import sys
+import time
+
+from routing import (
+    router, DOC_TYPE_KEYWORDS, EMAIL_KEYWORDS, RAG_KEYWORDS,
+    COMPOSE_PATTERNS, SENDER_BOUNDARY_WORDS, SENDER_STOP_WORDS,
+)
+
+# (query, expected doc_type, expected route, expected compose intent)
+# route is what chat_node forces after resolving conflicts: "rag", "email" or None
+LABELLED_QUERIES = [
+    ("What is our total expenditure on invoices this quarter?", "invoices", "rag", False),
+    ("List all unpaid invoices and their due dates", "invoices", "rag", False),
+    ("Which vendor has the highest total amount billed?", "invoices", "rag", False),
+    ("Show me overdue bills", "invoices", "rag", False),
+    ("Summarise payments made to Nexora Solutions", "invoices", "rag", False),
+    ("Do we have a receipt for the cloud hosting billing?", "invoices", "rag", False),
+    ("What are customers saying in their reviews?", "reviews", "rag", False),
+    ("Summarise the negative review trends", "reviews", "rag", False),
+    ("What is the overall sentiment of customer feedback?", "reviews", "rag", False),
+    ("List the top complaints from testimonials", "reviews", "rag", False),
+    ("What ratings did the mobile app get?", "reviews", "rag", False),
+    ("What does the payment processing policy say about late payments?", "invoices", "rag", False),
+    ("Explain the escalation procedure in our SOP", "policies", "rag", False),
+    ("What are the compliance guidelines for vendor onboarding?", "policies", "rag", False),
+    ("Which policies cover data retention regulation?", "policies", "rag", False),
+    ("Summarise the support ticket threads from March", "threads", "rag", False),
+    ("What was the outcome of the discussion in thread 3?", "threads", "rag", False),
+    ("Show me the conversation about INV-2045", "threads", None, False),
+    ("Check my email", None, "email", False),
+    ("Do I have any unread emails?", None, "email", False),
+    ("Summarise my inbox", None, "email", False),
+    ("Any important mails today?", None, "email", False),
+    ("Show me my email from ommi", None, "email", False),
+    ("Did I get any meeting invite this week?", None, "email", False),
+    ("Find the email from Laura about the invoice", "invoices", "email", False),
+    ("Check my inbox for invoices", "invoices", "email", False),
+    ("Any emails regarding payment reminders?", "invoices", "email", False),
+    ("Draft an email to the vendor about the overdue invoice", "invoices", "rag", True),
+    ("Write a reply email using the refund policy", "policies", "rag", True),
+    ("Compose a mail to Orion about their unpaid bill", "invoices", "rag", True),
+    ("Reply to this complaint email politely", "reviews", "rag", True),
+    ("Hi, my name is Priya", None, None, False),
+    ("Hello there!", None, None, False),
+    ("What can you do?", None, None, False),
+    ("How do I reset my hotmail password?", None, None, False),
+    ("Is isopropyl alcohol flammable?", None, None, False),
+    ("Tell me about paramount pictures", None, None, False),
+    ("What documents do you have indexed?", None, "rag", False),
+    ("Give me the changelog for the last release", None, "rag", False),
+    ("Which contract proposals are pending?", None, "rag", False),
+]
+
+# (query, expected sender)
+LABELLED_SENDERS = [
+    ("email from ommi", "ommi"),
+    ("show me mails from laura mendes regarding invoices", "laura mendes"),
+    ("any invoice sent by orion", "orion"),
+    ("emails from me", None),
+    ("what did rahul send", None),
+]
+
+
+# ── Old implementation, kept verbatim for comparison ─────────────────────
+def legacy_route(query):
+    text = query.lower()
+    scores = {}
+    for doc_type, keywords in DOC_TYPE_KEYWORDS.items():
+        score = sum(1 for kw in keywords if kw in text)
+        if score > 0:
+            scores[doc_type] = score
+    doc_type = max(scores, key=scores.get) if scores else None
+    is_email = any(kw in text for kw in EMAIL_KEYWORDS)
+    is_rag = any(kw in text for kw in RAG_KEYWORDS)
+    is_compose = any(re.search(p, text, re.IGNORECASE) for p in COMPOSE_PATTERNS)
+    return doc_type, is_email, is_rag, is_compose
+
+
+def legacy_sender(query):
+    pattern = rf"(?:from|by|sent by)\s+([a-zA-Z0-9_.+-]+(?:\s+(?!{SENDER_BOUNDARY_WORDS})[a-zA-Z0-9_.+-]+)?)"
+    match = re.search(pattern, query, re.IGNORECASE)
+    if match:
+        name = match.group(1).strip()
+        if name.lower() not in SENDER_STOP_WORDS:
+            return name
+    return None
+
+
+def new_route(query):
+    route = router.route(query)
+    return route.doc_type, route.is_email_query, route.is_rag_query, route.is_compose_intent
+
+
+def resolve(is_email, is_rag, is_compose):
+    """Same conflict resolution as chat_node."""
+    if is_email and is_rag:
+        if is_compose:
+            is_email = False
+        else:
+            is_rag = False
+    if is_rag:
+        return "rag"
+    if is_email:
+        return "email"
+    return None
+
+
+def accuracy(route_fn, sender_fn):
+    correct = {"doc_type": 0, "route": 0, "compose": 0, "sender": 0}
+    misses = []
+    for query, doc_type, route, compose in LABELLED_QUERIES:
+        got_doc_type, is_email, is_rag, is_compose = route_fn(query)
+        got_route = resolve(is_email, is_rag, is_compose)
+        correct["doc_type"] += got_doc_type == doc_type
+        correct["route"] += got_route == route
+        correct["compose"] += is_compose == compose
+        if (got_doc_type, got_route, is_compose) != (doc_type, route, compose):
+            misses.append((query, got_doc_type, got_route, is_compose))
+    for query, sender in LABELLED_SENDERS:
+        correct["sender"] += sender_fn(query) == sender
+    return correct, misses
+
+
+def time_per_call(fn, iterations):
+    queries = [q for q, *_ in LABELLED_QUERIES]
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for q in queries:
+            fn(q)
+    return (time.perf_counter() - start) / (iterations * len(queries)) * 1e6
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    def legacy_full(q):
+        legacy_route(q)
+        legacy_sender(q.lower())
+
+    def new_full(q):
+        # Force the lazily computed fields so both sides do the same work
+        route = router.route(q)
+        route.is_compose_intent, route.sender
+
+    totals = {"doc_type": len(LABELLED_QUERIES), "route": len(LABELLED_QUERIES),
+              "compose": len(LABELLED_QUERIES), "sender": len(LABELLED_SENDERS)}
+
+    for name, route_fn, sender_fn, full_fn in [
+        ("legacy", legacy_route, legacy_sender, legacy_full),
+        ("router", new_route, router.sender, new_full),
+    ]:
+        correct, misses = accuracy(route_fn, sender_fn)
+        us = time_per_call(full_fn, iterations)
+        summary = ", ".join(f"{k} {correct[k]}/{totals[k]}" for k in totals)
+        print(f"[{name}] {us:.1f} µs/message | {summary}")
+        for query, doc_type, route, compose in misses:
+            print(f"    miss: '{query}' -> doc_type={doc_type}, route={route}, compose={compose}")
+
+
+if __name__ == "__main__":
+    main()
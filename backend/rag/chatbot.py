@@ -1,6 +1,5 @@
 import os
 import sys
-from langchain_ollama import ChatOllama, OllamaEmbeddings
 from langchain_community.vectorstores import FAISS
 from langchain_core.tools import tool
 from langgraph.graph import StateGraph, START
@@ -10,23 +9,59 @@ from langchain_core.messages import HumanMessage, BaseMessage, SystemMessage
 from langgraph.prebuilt import ToolNode, tools_condition
 from langgraph.checkpoint.sqlite import SqliteSaver
 import sqlite3
-from langchain_google_community import GmailToolkit
+import threading
+from collections import OrderedDict
 from dotenv import load_dotenv
+from routing import router
+from backends import get_chat_model, get_embeddings, get_gmail_tools
+from compact_docstore import SqliteDocstore, current_index, has_compact_docstore, load_compact_faiss, search_by_doc_type
+from speculation import Speculator
+from embed_batcher import BatchingEmbeddings
 
 load_dotenv()
 
-llm = ChatOllama(
-    model=os.getenv("OLLAMA_CHAT_MODEL", "qwen2.5:3b")
-)
-embeddings = OllamaEmbeddings(
-    model=os.getenv("OLLAMA_EMBEDDING_MODEL", "qwen3-embedding:4b")
-)
+# Ollama / Gmail by default; LLM_BACKEND / EMBEDDING_BACKEND / GMAIL_BACKEND=fake for load tests
+llm = get_chat_model()
+embeddings = get_embeddings()
+if os.getenv("EMBED_BATCHING", "1") == "1":
+    # Concurrent rag_tool queries share one batched embed call
+    embeddings = BatchingEmbeddings(
+        embeddings,
+        max_batch_size=int(os.getenv("EMBED_BATCH_MAX_SIZE", "16")),
+        max_wait_ms=float(os.getenv("EMBED_BATCH_MAX_WAIT_MS", "5")),
+    )
+
+FAISS_INDEX_DIR = "faiss_index"
+
+def load_vector_store(index_dir=FAISS_INDEX_DIR):
+    if has_compact_docstore(index_dir) and os.getenv("DOCSTORE_BACKEND", "sqlite") == "sqlite":
+        # Chunks stay on disk and load on demand instead of unpickling every Document
+        store = load_compact_faiss(index_dir, embeddings)
+        print(f"[RAG] Loaded FAISS index with SQLite docstore ({store.index.ntotal} vectors)")
+        return store
+    return FAISS.load_local(
+        index_dir,
+        embeddings,
+        allow_dangerous_deserialization=True
+    )
 
-vector_store = FAISS.load_local(
-    "faiss_index",
-    embeddings,
-    allow_dangerous_deserialization=True
-)
+_corpus_version, _index_path = current_index(FAISS_INDEX_DIR)
+vector_store = load_vector_store(_index_path)
+
+def corpus_version():
+    """Version tag of the loaded FAISS index, used to key caches."""
+    return _corpus_version
+
+def reload_vector_store_if_changed():
+    """Swap in a newly published index. In-flight searches finish on the old one."""
+    global vector_store, _corpus_version
+    version, index_path = current_index(FAISS_INDEX_DIR)
+    if version == _corpus_version:
+        return False
+    # Each published version has its own directory, so this loads one consistent index
+    vector_store, _corpus_version = load_vector_store(index_path), version
+    print(f"[RAG] Reloaded FAISS index (version {version})")
+    return True
 
 import json
 
@@ -107,31 +142,13 @@ def assign_priority(data):
 
     return "low"
 
-# Keywords that map a query to a specific doc_type folder
-DOC_TYPE_KEYWORDS = {
-    "invoices": ["invoice", "invoices", "expenditure", "expenditures", "billing",
-                 "bill", "bills", "receipt", "receipts", "payment", "payments",
-                 "amount", "total amount", "due date", "vendor", "unpaid", "overdue"],
-    "reviews":  ["review", "reviews", "feedback", "rating", "ratings", "testimonial",
-                 "testimonials", "sentiment", "customer feedback", "negative review",
-                 "positive review", "complaint", "complaints"],
-    "policies": ["policy", "policies", "sop", "procedure", "guideline", "guidelines",
-                 "compliance", "regulation"],
-    "threads":  ["thread", "threads", "conversation", "email thread", "discussion",
-                 "correspondence", "support ticket", "ticket"],
-}
-
 def detect_doc_type(query: str):
     """Detect the most relevant doc_type based on query keywords."""
-    query_lower = query.lower()
-    scores = {}
-    for doc_type, keywords in DOC_TYPE_KEYWORDS.items():
-        score = sum(1 for kw in keywords if kw in query_lower)
-        if score > 0:
-            scores[doc_type] = score
-    if scores:
-        return max(scores, key=scores.get)
-    return None
+    return router.doc_type(query)
+
+# Backend calls started ahead of the tool call when routing is ambiguous (see chat_node)
+SPECULATIVE_TOOLS = os.getenv("SPECULATIVE_TOOLS", "1") == "1"
+speculator = Speculator()
 
 @tool
 def rag_tool(query: str):
@@ -148,74 +165,49 @@ def rag_tool(query: str):
 
     DO NOT answer document-related questions without calling this tool first.
     """
+    hit, result = speculator.take(("rag", query, corpus_version()))
+    if hit:
+        print(f"[RAG] Using speculative retrieval ({len(result)} docs)")
+    else:
+        result = retrieve_documents(query)
+
+    context = [doc.page_content for doc in result]
+    metadata = [doc.metadata for doc in result]
+
+    return {
+        'query': query,
+        'context': context,
+        'metadata': metadata
+    }
+
+def retrieve_documents(query: str):
+    """FAISS retrieval behind rag_tool, filtered to the detected doc_type when there is one."""
     target_type = detect_doc_type(query)
     k = 10
 
     if target_type:
         # Use FAISS native filtering — only search within the target doc_type
         # fetch_k must be large enough to find docs of the target type among all candidates
-        result = vector_store.similarity_search(query, k=k, filter={"doc_type": target_type}, fetch_k=300)
+        if isinstance(vector_store.docstore, SqliteDocstore):
+            result = search_by_doc_type(vector_store, query, k, target_type, fetch_k=300)
+        else:
+            result = vector_store.similarity_search(query, k=k, filter={"doc_type": target_type}, fetch_k=300)
         print(f"[RAG] Retrieved {len(result)} '{target_type}' docs (native filter)")
     else:
         # No type detected — search all documents
         result = vector_store.similarity_search(query, k=k)
         print(f"[RAG] No doc_type detected, returning top {len(result)} results")
 
-    context = [doc.page_content for doc in result]
-    metadata = [doc.metadata for doc in result]
+    return result
 
-    return {
-        'query': query,
-        'context': context,
-        'metadata': metadata
-    }
-
-gmail_tools = GmailToolkit().get_tools()
+gmail_tools = get_gmail_tools()
 
 def extract_sender_from_query(query: str):
     """Extract sender/person name from queries like 'email from ommi'."""
-    # Words that signal the end of a sender name
-    boundary_words = (
-        "regarding|about|concerning|for|with|on|that|which|and|or|"
-        "invoice|invoices|payment|receipt|bill|report|review|policy|"
-        "subject|today|yesterday|last|this|please|can|could|check"
-    )
-    # Capture one or two words after from/by/sent by, but stop at boundary words
-    patterns = [
-        rf"(?:from|by|sent by)\s+([a-zA-Z0-9_.+-]+(?:\s+(?!{boundary_words})[a-zA-Z0-9_.+-]+)?)",
-    ]
-    for pattern in patterns:
-        match = re.search(pattern, query, re.IGNORECASE)
-        if match:
-            name = match.group(1).strip()
-            # Filter out stop words that might get captured
-            stop_words = {"me", "my", "the", "a", "an", "inbox", "email", "mail"}
-            if name.lower() not in stop_words:
-                return name
-    return None
-
-@tool
-def gmail_intelligence_tool(query: str = "in:inbox", max_results: int = 5):
-    """
-    Analyze Gmail inbox and return structured business intelligence.
-
-    Use when user asks about:
-    - Important or urgent emails
-    - Invoices, payments, or billing emails
-    - Client or vendor communications
-    - Meeting invitations or event notifications
-    - Inbox summaries or email overviews
-    - Any email-related business inquiry
-    """
-    if not max_results:
-        max_results = 1
-
-    search_tool = [t for t in gmail_tools if t.name == "search_gmail"][0]
-
-    normalized_query = query.lower().strip()
-
-    sender = extract_sender_from_query(normalized_query)
+    return router.sender(query)
 
+def build_gmail_query(normalized_query: str, sender=None):
+    """Translate a lowercased user query into a Gmail search string."""
     # Build Gmail query parts
     query_parts = ["in:inbox"]
 
@@ -242,15 +234,45 @@ def gmail_intelligence_tool(query: str = "in:inbox", max_results: int = 5):
         if keywords:
             query_parts.append(" ".join(keywords))
 
-    gmail_query = " ".join(query_parts)
+    return " ".join(query_parts)
 
-    print(f"[Gmail] Search query: {gmail_query}")
-
-    raw_result = search_tool.invoke({
+def search_gmail(gmail_query: str, max_results: int):
+    search_tool = [t for t in gmail_tools if t.name == "search_gmail"][0]
+    return search_tool.invoke({
         "query": gmail_query,
         "max_results": max_results
     })
 
+@tool
+def gmail_intelligence_tool(query: str = "in:inbox", max_results: int = 5):
+    """
+    Analyze Gmail inbox and return structured business intelligence.
+
+    Use when user asks about:
+    - Important or urgent emails
+    - Invoices, payments, or billing emails
+    - Client or vendor communications
+    - Meeting invitations or event notifications
+    - Inbox summaries or email overviews
+    - Any email-related business inquiry
+    """
+    if not max_results:
+        max_results = 1
+
+    normalized_query = query.lower().strip()
+
+    sender = extract_sender_from_query(normalized_query)
+
+    gmail_query = build_gmail_query(normalized_query, sender)
+
+    print(f"[Gmail] Search query: {gmail_query}")
+
+    hit, raw_result = speculator.take(("gmail", gmail_query, max_results))
+    if hit:
+        print("[Gmail] Using speculative search result")
+    else:
+        raw_result = search_gmail(gmail_query, max_results)
+
     # Cascading fallback when sender-based search returns nothing
     # Tier 1: from:sender (already tried above)
     # Tier 2: sender + topic keyword
@@ -283,20 +305,14 @@ def gmail_intelligence_tool(query: str = "in:inbox", max_results: int = 5):
             if topic:
                 fallback_query = f"in:inbox {sender} {topic}"
                 print(f"[Gmail] Tier 2 fallback: {fallback_query}")
-                raw_result = search_tool.invoke({
-                    "query": fallback_query,
-                    "max_results": max_results
-                })
+                raw_result = search_gmail(fallback_query, max_results)
                 parsed = _parse_gmail_result(raw_result)
 
             # Tier 3: sender only (if Tier 2 still returned nothing)
             if len(parsed) == 0:
                 fallback_query = f"in:inbox {sender}"
                 print(f"[Gmail] Tier 3 fallback: {fallback_query}")
-                raw_result = search_tool.invoke({
-                    "query": fallback_query,
-                    "max_results": max_results
-                })
+                raw_result = search_gmail(fallback_query, max_results)
 
     if isinstance(raw_result, str):
         try:
@@ -358,45 +374,62 @@ def gmail_intelligence_tool(query: str = "in:inbox", max_results: int = 5):
 tools = [rag_tool, gmail_intelligence_tool]
 llm_with_tools = llm.bind_tools(tools)
 
-import re
-
 class ChatState(TypedDict):
     messages: Annotated[list[BaseMessage], add_messages]
 
 
-NAME_PATTERNS = [
-    r"(?:my name is|i'm|i am|call me|this is)\s+([A-Z][a-z]+)",
-    r"(?:name's)\s+([A-Z][a-z]+)",
-]
+# thread_id -> (number of messages already scanned, facts found in them)
+_user_facts_cache = OrderedDict()
+_user_facts_lock = threading.Lock()
+MAX_CACHED_THREADS = 1024
 
-def extract_user_facts(messages):
-    """Scan full message history for key personal facts that should persist."""
-    facts = {}
-    for msg in messages:
+def extract_user_facts(messages, thread_id=None):
+    """
+    Scan message history (newest first) for key personal facts that should persist.
+    With a thread_id, only messages added since the last call for that thread are scanned.
+    """
+    start, facts = 0, {}
+    if thread_id is not None:
+        with _user_facts_lock:
+            cached = _user_facts_cache.get(thread_id)
+        if cached is not None and cached[0] <= len(messages):
+            start, facts = cached[0], dict(cached[1])
+
+    for msg in reversed(messages[start:]):
         if isinstance(msg, HumanMessage):
-            text = msg.content
-            for pattern in NAME_PATTERNS:
-                match = re.search(pattern, text, re.IGNORECASE)
-                if match:
-                    facts["user_name"] = match.group(1).title()
-    return facts
-
-EMAIL_KEYWORDS = ["email", "emails", "inbox", "mail", "mails", "gmail",
-                   "unread", "recent emails", "check my email", "show me my email",
-                   "vendor email", "client email",
-                   "meeting invite", "correspondence"]
+            name = router.user_name(msg.content)
+            if name:
+                # Latest mention wins, so stop at the first hit from the end
+                facts["user_name"] = name
+                break
 
-RAG_KEYWORDS = ["invoice", "invoices", "expenditure", "expenditures", "billing",
-                "bill", "bills", "receipt", "receipts", "payment", "payments",
-                "review", "reviews", "feedback", "rating", "ratings",
-                "complaint", "complaints", "sentiment", "testimonial",
-                "policy", "policies", "sop", "procedure", "guideline",
-                "report", "contract", "proposal", "feature", "changelog",
-                "document", "documents", "docs", "from the docs",
-                "support ticket", "thread", "threads"]
+    if thread_id is not None:
+        with _user_facts_lock:
+            _user_facts_cache[thread_id] = (len(messages), facts)
+            _user_facts_cache.move_to_end(thread_id)
+            while len(_user_facts_cache) > MAX_CACHED_THREADS:
+                _user_facts_cache.popitem(last=False)
+    return facts
 
 MAX_CONTEXT_MESSAGES = 10
 
+def speculation_key(user_msg: str, tool_name: str):
+    """Key under which the tool looks up a speculative result for the call chat_node forces."""
+    if tool_name == "rag_tool":
+        return ("rag", user_msg, corpus_version())
+    normalized_query = user_msg.strip()
+    gmail_query = build_gmail_query(normalized_query, extract_sender_from_query(normalized_query))
+    # 5 = gmail_intelligence_tool's default max_results
+    return ("gmail", gmail_query, 5)
+
+def speculate_tool(user_msg: str, tool_name: str):
+    """Start the backend call of one tool with the arguments chat_node tells the model to use."""
+    key = speculation_key(user_msg, tool_name)
+    if tool_name == "rag_tool":
+        speculator.start(key, lambda: retrieve_documents(user_msg), case="both")
+    else:
+        speculator.start(key, lambda: search_gmail(key[1], key[2]), case="both")
+
 def chat_node(state: ChatState, config=None):
     """LLM node that may answer or request a tool call."""
     thread_id = None
@@ -409,26 +442,32 @@ def chat_node(state: ChatState, config=None):
             last_user_msg = msg.content.lower()
             break
 
-    is_email_query = any(kw in last_user_msg for kw in EMAIL_KEYWORDS)
-    is_rag_query = any(kw in last_user_msg for kw in RAG_KEYWORDS)
+    route = router.route(last_user_msg)
+    is_email_query = route.is_email_query
+    is_rag_query = route.is_rag_query
 
-    # Detect email-compose intent: "draft email", "reply email", "write email", "send email"
-    # These mean the user wants to CREATE an email, not SEARCH Gmail
-    compose_patterns = [
-        r"(?:draft|write|compose|create|send|reply|respond|prepare|generate)\s+(?:a\s+|an\s+|the\s+)?(?:reply\s+)?(?:email|mail|response)",
-        r"(?:reply|respond)\s+(?:to\s+)?(?:this|that|the|his|her)",
-    ]
-    is_compose_intent = any(re.search(p, last_user_msg, re.IGNORECASE) for p in compose_patterns)
+    is_ambiguous = is_email_query == is_rag_query
 
     if is_email_query and is_rag_query:
-        if is_compose_intent:
+        if route.is_compose_intent:
             # User wants to compose using document data → use RAG
             is_email_query = False
         else:
             # User wants to look up emails about a topic → use Gmail
             is_rag_query = False
 
-    user_facts = extract_user_facts(state["messages"])
+    # Ambiguous routing: warm up the tool the model will call while it decides.
+    # Only on a fresh user turn, not when we come back from the tool node.
+    if SPECULATIVE_TOOLS and is_ambiguous and isinstance(state["messages"][-1], HumanMessage):
+        if is_rag_query or is_email_query:
+            # Both matched: the tool and its query are forced below, so the call is known
+            speculate_tool(last_user_msg, "gmail_intelligence_tool" if is_email_query else "rag_tool")
+        else:
+            # Neither: the model picks freely and rarely reuses the exact message as the query,
+            # so only track how often retrieval speculation would have hit
+            speculator.shadow(speculation_key(last_user_msg, "rag_tool"), case="neither")
+
+    user_facts = extract_user_facts(state["messages"], thread_id)
 
     system_content = (
         "You are an enterprise AI assistant with access to two powerful tools.\n"
@@ -493,6 +532,9 @@ def chat_node(state: ChatState, config=None):
 tool_node = ToolNode(tools)
 
 conn = sqlite3.connect(database="chatbot.db", check_same_thread=False)
+# WAL + busy timeout so several worker processes can share the checkpoint file
+conn.execute("PRAGMA journal_mode=WAL")
+conn.execute("PRAGMA busy_timeout=5000")
 checkpointer = SqliteSaver(conn=conn)
 
 graph = StateGraph(ChatState)
@@ -6,14 +6,27 @@ from flask import Flask, request, jsonify, Response
 import sys
 import os
 import json
+import threading
+import time
 
 # Make sure we can import chatbot from the same directory
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from chatbot import chatbot, HumanMessage
+import chatbot as chatbot_module
+from chatbot import chatbot, HumanMessage, corpus_version
+from single_flight import SingleFlight, normalize_query
+from vector_search import VectorMatrix
 
 app = Flask(__name__)
 
+# Identical /chat requests that arrive while one is already running share its result
+chat_flight = SingleFlight()
+
+# Matrix search over the embeddings exported by export_to_sqlite.py (used by the Node backend)
+search_index = VectorMatrix(
+    os.getenv("SEARCH_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "db", "slingshot.db"))
+)
+
 
 @app.route("/chat", methods=["POST"])
 def chat_endpoint():
@@ -29,10 +42,19 @@ def chat_endpoint():
             return jsonify({"error": "No query provided"}), 400
 
         config = {"configurable": {"thread_id": thread_id}}
-        response = chatbot.invoke(
-            {"messages": [HumanMessage(content=query)]}, config=config
-        )
-        answer = response["messages"][-1].content
+
+        def run():
+            response = chatbot.invoke(
+                {"messages": [HumanMessage(content=query)]}, config=config
+            )
+            return response["messages"][-1].content
+
+        # Key includes thread_id: requests on the same conversation see the same
+        # history, so running the graph once also avoids duplicate checkpointed turns
+        key = (normalize_query(query), corpus_version(), thread_id)
+        answer, shared = chat_flight.do(key, run)
+        if shared:
+            print(f"[Coalesce] Shared in-flight answer for thread={thread_id} query='{query[:80]}'")
         return jsonify({"answer": answer})
     except Exception as e:
         import traceback
@@ -137,12 +159,93 @@ def chat_stream():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/search", methods=["POST"])
+def search_endpoint():
+    """
+    Top-k chunks for one or many queries.
+    Body: {"embedding": [...]} | {"embeddings": [[...], ...]} | {"query": "..."} | {"queries": [...]},
+    plus optional "top_k", "doc_type" and "source" (substring of source_file).
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({"error": "No JSON data received"}), 400
+
+        # Validate everything before any embedding call reaches Ollama
+        top_k = data.get("top_k", 5)
+        if not isinstance(top_k, int) or isinstance(top_k, bool) or top_k < 1:
+            return jsonify({"error": "top_k must be a positive integer"}), 400
+        for field in ("doc_type", "source"):
+            if data.get(field) is not None and not isinstance(data[field], str):
+                return jsonify({"error": f"{field} must be a string"}), 400
+
+        batched = "embeddings" in data or "queries" in data
+        if "embeddings" in data or "embedding" in data:
+            vectors = data["embeddings"] if batched else [data["embedding"]]
+            if not isinstance(vectors, list) or not all(isinstance(v, list) and v for v in vectors):
+                return jsonify({"error": "embedding(s) must be non-empty lists of numbers"}), 400
+            texts = None
+        elif "queries" in data or "query" in data:
+            texts = data["queries"] if batched else [data["query"]]
+            if not isinstance(texts, list) or not all(isinstance(t, str) and t.strip() for t in texts):
+                return jsonify({"error": "query/queries must be non-empty strings"}), 400
+        else:
+            return jsonify({"error": "Provide embedding(s) or query/queries"}), 400
+
+        if texts is not None:
+            if len(texts) == 1:
+                vectors = [chatbot_module.embeddings.embed_query(texts[0])]
+            else:
+                vectors = chatbot_module.embeddings.embed_documents(texts)
+
+        if not vectors:
+            return jsonify({"results": []})
+
+        results = search_index.search(
+            vectors,
+            top_k=top_k,
+            doc_type=data.get("doc_type"),
+            source=data.get("source"),
+        )
+        return jsonify({"results": results if batched else results[0]})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        import traceback
+        print("🔥 Search Error:", traceback.format_exc())
+        return jsonify({"error": str(e)}), 500
+
+
+def watch_index(interval):
+    """Poll for a newly published FAISS index and hot-swap it (see compact_docstore.publish_index)."""
+    while True:
+        time.sleep(interval)
+        try:
+            chatbot_module.reload_vector_store_if_changed()
+        except Exception as e:
+            # Keep serving the current index; retry on the next tick
+            print(f"[RAG] Index reload failed: {type(e).__name__}: {e}")
+
+
 @app.route("/health", methods=["GET"])
 def health():
-    return jsonify({"status": "ok"})
+    return jsonify({
+        "status": "ok",
+        "worker_id": os.getenv("CHATBOT_WORKER_ID"),
+        "corpus_version": corpus_version(),
+        "coalescing": {**chat_flight.stats, "in_flight": chat_flight.in_flight()},
+        "speculation": chatbot_module.speculator.stats,
+        "embedding_batches": chatbot_module.embeddings.stats() if hasattr(chatbot_module.embeddings, "stats") else None,
+    })
 
 
 if __name__ == "__main__":
-    print("🤖 Python Chatbot API starting on http://127.0.0.1:5001")
+    port = int(os.getenv("CHATBOT_PORT", "5001"))
+    host = os.getenv("CHATBOT_HOST", "0.0.0.0")
+    reload_interval = float(os.getenv("INDEX_RELOAD_INTERVAL", "0"))
+    if reload_interval > 0:
+        threading.Thread(target=watch_index, args=(reload_interval,), daemon=True).start()
+
+    print(f"🤖 Python Chatbot API starting on http://127.0.0.1:{port}")
     print("   Streaming endpoint: POST /chat/stream")
-    app.run(host="0.0.0.0", port=5001, debug=False, threaded=True)
+    app.run(host=host, port=port, debug=False, threaded=True)
@@ -0,0 +1,250 @@
+"""
+Multi-process mode for chatbot_server.py
+
+Starts N chatbot_server.py worker processes on loopback ports and serves the
+usual API on one public port, routing each request to a worker by a
+consistent hash of its thread_id. A conversation's checkpointed state stays
+hot in one worker, and adding or losing a worker only remaps ~1/N threads.
+Requests without a thread_id, or with the shared default "1" that the Node app
+sends for everyone, are hashed by their normalized query instead, so identical
+questions coalesce in one worker and different ones spread out.
+
+Workers share:
+  - the SQLite docstore, memory-mapped read-only (see compact_docstore.py),
+    so the OS keeps one copy of the chunk text in the page cache
+  - the FAISS vectors, memory-mapped when the faiss build supports it for
+    flat indexes (IO_FLAG_MMAP_IFC, faiss >= 1.8); otherwise each worker
+    holds its own copy
+  - chatbot.db, opened in WAL mode with a busy timeout
+Each worker polls faiss_index/CURRENT and hot-swaps a newly published index
+(ingest_docs.py), so re-ingesting needs no restart. Crashed workers are
+restarted; while one is down its threads fail over to the next worker on the ring.
+
+Usage:
+    cd backend/rag
+    python chatbot_workers.py --workers 4
+"""
+import argparse
+import bisect
+import hashlib
+import http.client
+import itertools
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+from flask import Flask, Response, jsonify, request
+
+from single_flight import normalize_query
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chatbot_server.py")
+SHARED_THREAD_ID = "1"  # chatbot_server.py default, also hard-coded by the Node routes
+HOP_BY_HOP = {"connection", "keep-alive", "transfer-encoding", "content-length", "content-encoding"}
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hash ring with virtual nodes."""
+
+    def __init__(self, nodes, replicas=64):
+        self._ring = sorted((_hash(f"{node}#{r}"), node) for node in nodes for r in range(replicas))
+        self._keys = [h for h, _ in self._ring]
+
+    def candidates(self, key: str):
+        """Nodes in ring order starting at the owner of key, each once."""
+        start = bisect.bisect(self._keys, _hash(key)) % len(self._ring)
+        seen = set()
+        for i in range(len(self._ring)):
+            node = self._ring[(start + i) % len(self._ring)][1]
+            if node not in seen:
+                seen.add(node)
+                yield node
+
+
+class Worker:
+    def __init__(self, worker_id, port, env):
+        self.worker_id = worker_id
+        self.port = port
+        self.env = env
+        self.proc = None
+        self.ready = False
+
+    def start(self):
+        self.ready = False
+        env = {**self.env, "CHATBOT_WORKER_ID": str(self.worker_id), "CHATBOT_PORT": str(self.port),
+               "CHATBOT_HOST": "127.0.0.1"}
+        self.proc = subprocess.Popen([sys.executable, SERVER_SCRIPT], env=env, cwd=os.path.dirname(SERVER_SCRIPT))
+        print(f"[Workers] Started worker {self.worker_id} (pid {self.proc.pid}) on port {self.port}")
+
+    def alive(self):
+        return self.proc is not None and self.proc.poll() is None
+
+    def health(self, timeout=2.0):
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=timeout)
+        try:
+            conn.request("GET", "/health")
+            resp = conn.getresponse()
+            return json.loads(resp.read()) if resp.status == 200 else None
+        except (OSError, ValueError):
+            return None
+        finally:
+            conn.close()
+
+
+class WorkerPool:
+    def __init__(self, n_workers, base_port, env):
+        self.workers = {i: Worker(i, base_port + i, env) for i in range(n_workers)}
+        self.ring = HashRing(list(self.workers))
+        self._round_robin = itertools.cycle(range(n_workers))
+        self._stopping = False
+
+    def start(self):
+        for worker in self.workers.values():
+            worker.start()
+        threading.Thread(target=self._supervise, daemon=True).start()
+
+    def _supervise(self):
+        while not self._stopping:
+            for worker in self.workers.values():
+                if not worker.alive():
+                    print(f"[Workers] Worker {worker.worker_id} exited, restarting")
+                    worker.start()
+                elif not worker.ready and worker.health() is not None:
+                    worker.ready = True
+                    print(f"[Workers] Worker {worker.worker_id} ready")
+            time.sleep(1.0)
+
+    def pick(self, key=None):
+        """Owner of key on the ring (or round robin without one), skipping workers that are not ready."""
+        if key is None:
+            ids = list(self.workers)
+            start = next(self._round_robin)
+            order = ids[start:] + ids[:start]
+        else:
+            order = self.ring.candidates(key)
+        for worker_id in order:
+            worker = self.workers[worker_id]
+            if worker.ready and worker.alive():
+                return worker
+        return None
+
+    def stop(self):
+        self._stopping = True
+        for worker in self.workers.values():
+            if worker.alive():
+                worker.proc.terminate()
+        for worker in self.workers.values():
+            if worker.proc is not None:
+                try:
+                    worker.proc.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    worker.proc.kill()
+
+
+def chat_route_key(data):
+    """
+    Ring key for a chat request: its thread_id, except for the shared default that the
+    Node app sends for every user. Those are keyed by the normalized query instead, so
+    identical questions reach the same worker and coalesce there (see single_flight.py)
+    while different questions still spread out; their checkpoints live in the shared
+    chatbot.db, so any worker can serve them.
+    """
+    thread_id = data.get("thread_id")
+    if thread_id is None or str(thread_id) == SHARED_THREAD_ID:
+        query = data.get("query")
+        return f"query:{normalize_query(query)}" if isinstance(query, str) and query.strip() else None
+    return str(thread_id)
+
+
+def create_app(pool, timeout):
+    app = Flask(__name__)
+
+    @app.route("/health", methods=["GET"])
+    def health():
+        workers = {}
+        for worker in pool.workers.values():
+            workers[worker.worker_id] = worker.health() if worker.alive() else None
+        ok = any(w is not None for w in workers.values())
+        return jsonify({"status": "ok" if ok else "down", "workers": workers}), 200 if ok else 503
+
+    @app.route("/<path:path>", methods=["GET", "POST"])
+    def proxy(path):
+        body = request.get_data()
+        route_key = None
+        if path.startswith("chat") and request.is_json:
+            # Only chat bodies carry a thread_id; everything else (e.g. /search embeddings)
+            # is forwarded without being parsed here
+            data = request.get_json(silent=True)
+            if isinstance(data, dict):
+                route_key = chat_route_key(data)
+
+        worker = pool.pick(route_key)
+        if worker is None:
+            return jsonify({"error": "No chatbot workers available"}), 503
+
+        conn = http.client.HTTPConnection("127.0.0.1", worker.port, timeout=timeout)
+        try:
+            conn.request(request.method, request.full_path.rstrip("?"), body=body,
+                         headers={"Content-Type": request.content_type or "application/json"})
+            resp = conn.getresponse()
+        except OSError as e:
+            conn.close()
+            return jsonify({"error": f"Worker {worker.worker_id} unreachable: {e}"}), 502
+
+        headers = [(k, v) for k, v in resp.getheaders() if k.lower() not in HOP_BY_HOP]
+        headers.append(("X-Chatbot-Worker", str(worker.worker_id)))
+
+        if resp.getheader("Content-Type", "").startswith("text/event-stream"):
+            def relay():
+                # SSE is line-framed; forward each line as soon as the worker emits it
+                try:
+                    for line in resp:
+                        yield line
+                finally:
+                    conn.close()
+            return Response(relay(), status=resp.status, headers=headers)
+
+        payload = resp.read()
+        conn.close()
+        return Response(payload, status=resp.status, headers=headers)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5001)
+    parser.add_argument("--worker-base-port", type=int, default=5101)
+    parser.add_argument("--reload-interval", type=float, default=5.0,
+                        help="seconds between checks for a newly published index")
+    parser.add_argument("--timeout", type=float, default=300)
+    args = parser.parse_args()
+
+    env = {**os.environ, "INDEX_RELOAD_INTERVAL": str(args.reload_interval)}
+    pool = WorkerPool(args.workers, args.worker_base_port, env)
+    pool.start()
+
+    def shutdown(*_):
+        pool.stop()
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, shutdown)
+
+    print(f"🤖 Python Chatbot API ({args.workers} workers) starting on http://127.0.0.1:{args.port}")
+    try:
+        create_app(pool, args.timeout).run(host=args.host, port=args.port, debug=False, threaded=True)
+    finally:
+        pool.stop()
+
+
+if __name__ == "__main__":
+    main()
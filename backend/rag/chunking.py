@@ -0,0 +1,165 @@
+"""
+Structure-aware chunking for ingest_docs.py
+
+RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200) cuts records
+blindly (line items away from their totals) and duplicates ~20% of the text in
+overlaps. Here the split depends on doc_type:
+
+    invoices, reviews   one chunk per document when it fits in max_chars
+    threads             whole thread if it fits, else packed at "---" message breaks
+    policies            whole policy if it fits, else packed at section headings,
+                        with the title line repeated so every chunk stays attributable
+
+Pages of the same source file are merged first, so a multi-page PDF is treated
+as one document. Anything that still does not fit (and unknown doc_types) falls
+back to the old recursive splitter, so no text is dropped.
+
+Usage (report on the bundled corpus, no embeddings needed):
+    python chunking.py
+"""
+import os
+import re
+import sys
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+MAX_CHARS = int(os.getenv("CHUNK_MAX_CHARS", "2000"))
+THREAD_SEPARATOR = re.compile(r"\n\s*-{3,}\s*\n")
+# A heading is a short standalone line without sentence punctuation, after a blank line
+HEADING = re.compile(r"(?:^|\n\s*\n)(?=[A-Z][^\n.:;,]{0,58}[^\n.:;,\s]\s*\n)")
+
+
+def baseline_splitter():
+    return RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+
+
+def _pack(parts, max_chars, joiner, prefix=""):
+    """Greedily join consecutive parts into chunks of at most max_chars; prefix starts every chunk after the first."""
+    chunks, current = [], ""
+    for part in parts:
+        candidate = current + joiner + part if current else part
+        if len(candidate) <= max_chars or not current:
+            current = candidate
+        else:
+            chunks.append(current)
+            current = prefix + part
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _split_thread(text, max_chars):
+    messages = [m.strip() for m in THREAD_SEPARATOR.split(text) if m.strip()]
+    return _pack(messages, max_chars, "\n\n---\n\n")
+
+
+def _split_policy(text, max_chars):
+    sections = [s.strip() for s in HEADING.split(text) if s.strip()]
+    if len(sections) < 2:
+        return [text]
+    # First section is the title block ("Title: ...", "Effective Date: ...")
+    title = sections[0].splitlines()[0]
+    return _pack(sections, max_chars, "\n\n", prefix=title + "\n\n")
+
+
+STRATEGIES = {
+    "invoices": lambda text, max_chars: [text],
+    "reviews": lambda text, max_chars: [text],
+    "threads": _split_thread,
+    "policies": _split_policy,
+}
+
+
+def _merge_pages(docs):
+    """
+    Join the per-page Documents of one source (PyPDFLoader emits one per page) so a
+    multi-page invoice or thread can be kept whole. Page numbers no longer apply.
+    """
+    merged, by_source = [], {}
+    for doc in docs:
+        source = doc.metadata.get("source")
+        if source is None or doc.metadata.get("doc_type") not in STRATEGIES:
+            merged.append(doc)
+            continue
+        if source not in by_source:
+            metadata = {k: v for k, v in doc.metadata.items() if k not in ("page", "page_label", "page_number")}
+            by_source[source] = Document(page_content=doc.page_content.strip(), metadata=metadata)
+            merged.append(by_source[source])
+        else:
+            first = by_source[source]
+            first.page_content = (first.page_content + "\n\n" + doc.page_content.strip()).strip()
+    return merged
+
+
+def chunk_documents(docs, max_chars=MAX_CHARS):
+    fallback = baseline_splitter()
+    chunks = []
+    for doc in _merge_pages(docs):
+        text = doc.page_content.strip()
+        if not text:
+            continue
+        strategy = STRATEGIES.get(doc.metadata.get("doc_type"))
+        if strategy is None or len(text) <= max_chars:
+            pieces = [text] if strategy is not None else None
+        else:
+            pieces = strategy(text, max_chars)
+
+        if pieces is None:
+            chunks.extend(fallback.split_documents([doc]))
+            continue
+        for piece in pieces:
+            if len(piece) > max_chars:
+                # A single record or section that is too long on its own
+                chunks.extend(fallback.split_documents([Document(page_content=piece, metadata=dict(doc.metadata))]))
+            else:
+                chunks.append(Document(page_content=piece, metadata=dict(doc.metadata)))
+    return chunks
+
+
+def chunk_report(docs, chunks):
+    """Chunk count and total chunk bytes vs the old 1000/200 splitter, per doc_type."""
+    baseline = baseline_splitter().split_documents(docs)
+    report = {}
+    for label, items in (("baseline", baseline), ("structured", chunks)):
+        for chunk in items:
+            doc_type = chunk.metadata.get("doc_type", "other")
+            row = report.setdefault(doc_type, {"baseline": [0, 0], "structured": [0, 0]})
+            row[label][0] += 1
+            row[label][1] += len(chunk.page_content.encode("utf-8"))
+    return report
+
+
+def print_chunk_report(report):
+    totals = {"baseline": [0, 0], "structured": [0, 0]}
+    print(f"   {'doc_type':<10} {'chunks (old → new)':>20} {'bytes (old → new)':>24}")
+    for doc_type, row in sorted(report.items()):
+        for label in totals:
+            totals[label][0] += row[label][0]
+            totals[label][1] += row[label][1]
+        print(f"   {doc_type:<10} {row['baseline'][0]:>9} → {row['structured'][0]:<8} "
+              f"{row['baseline'][1]:>11} → {row['structured'][1]:<10}")
+    (old_n, old_b), (new_n, new_b) = totals["baseline"], totals["structured"]
+    print(f"   {'total':<10} {old_n:>9} → {new_n:<8} {old_b:>11} → {new_b:<10}")
+    if old_n and old_b:
+        print(f"   Chunks {new_n / old_n - 1:+.1%}, bytes embedded {new_b / old_b - 1:+.1%}")
+
+
+def main():
+    docs_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "..", "embeddings", "docs")
+    docs = []
+    for root, _, files in os.walk(docs_dir):
+        for name in sorted(files):
+            if name.endswith(".txt"):
+                path = os.path.join(root, name)
+                with open(path, encoding="utf-8", errors="replace") as f:
+                    docs.append(Document(page_content=f.read(), metadata={
+                        "source": path, "doc_type": os.path.basename(root).lower()}))
+    chunks = chunk_documents(docs)
+    print(f"📄 {len(docs)} documents, max_chars={MAX_CHARS}")
+    print_chunk_report(chunk_report(docs, chunks))
+
+
+if __name__ == "__main__":
+    main()
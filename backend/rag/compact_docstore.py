@@ -0,0 +1,243 @@
+"""
+Compact, read-only docstore for the FAISS vector store
+
+FAISS.load_local unpickles every Document (text + metadata dict) into the heap
+of each server process. Instead, ingest_docs.py also writes the chunks to
+faiss_index/docstore.sqlite, keyed by their FAISS row position:
+
+    chunks(pos INTEGER PRIMARY KEY, text TEXT, metadata TEXT, doc_type TEXT)
+
+SqliteDocstore opens that file read-only and loads a chunk only when a search
+returns its row. search_by_doc_type() fetches all candidates of a filtered
+search in one query instead of one lookup per candidate. SQLite pages are memory-mapped, so several worker processes
+share one copy through the OS page cache and per-process memory stays flat as
+the corpus grows.
+
+publish_index() writes every index into its own directory that is never
+modified afterwards, then atomically repoints faiss_index/CURRENT at it:
+
+    faiss_index/CURRENT             "<version>"
+    faiss_index/<version>/          index.faiss, index.pkl, docstore.sqlite
+
+A loaded store only ever opens files under its own version directory, so
+threads that open the docstore later still see the chunks that match the
+vectors. Running servers poll CURRENT and reload without downtime.
+"""
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from collections.abc import Mapping
+
+from langchain_community.docstore.base import Docstore
+from langchain_core.documents import Document
+
+DOCSTORE_FILE = "docstore.sqlite"
+CURRENT_FILE = "CURRENT"
+MMAP_SIZE = 256 * 1024 * 1024
+
+
+def read_corpus_version(index_dir):
+    """Published version of the index; falls back to index.faiss mtime for flat layouts."""
+    try:
+        with open(os.path.join(index_dir, CURRENT_FILE), encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        pass
+    try:
+        return str(os.stat(os.path.join(index_dir, "index.faiss")).st_mtime_ns)
+    except OSError:
+        return "0"
+
+
+def current_index(index_dir):
+    """(version, directory) of the published index; flat indexes are served from index_dir itself."""
+    version = read_corpus_version(index_dir)
+    version_dir = os.path.join(index_dir, version)
+    if os.path.isfile(os.path.join(index_dir, CURRENT_FILE)) and os.path.isdir(version_dir):
+        return version, version_dir
+    return version, index_dir
+
+
+def publish_index(vector_store, index_dir, keep=0):
+    """
+    Save the store and its compact docstore to index_dir/<version>/ and point CURRENT at it.
+    keep > 0 deletes all but the newest `keep` versions; only do that once every
+    server has reloaded, since a store keeps opening files from its own directory.
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    version = str(time.time_ns())
+    staging = os.path.join(index_dir, version + ".staging")
+    vector_store.save_local(staging)
+    write_compact_docstore(vector_store, staging)
+    os.rename(staging, os.path.join(index_dir, version))
+
+    pointer_tmp = os.path.join(index_dir, CURRENT_FILE + ".tmp")
+    with open(pointer_tmp, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(pointer_tmp, os.path.join(index_dir, CURRENT_FILE))
+
+    if keep > 0:
+        versions = sorted((n for n in os.listdir(index_dir) if n.isdigit()), key=int)
+        for old in versions[:-keep]:
+            shutil.rmtree(os.path.join(index_dir, old), ignore_errors=True)
+    return version
+
+
+def has_compact_docstore(index_dir):
+    return os.path.isfile(os.path.join(index_dir, DOCSTORE_FILE))
+
+
+def write_compact_docstore(vector_store, index_dir):
+    """Dump the chunks of an in-memory FAISS store to index_dir/docstore.sqlite."""
+    path = os.path.join(index_dir, DOCSTORE_FILE)
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    conn.execute(
+        "CREATE TABLE chunks (pos INTEGER PRIMARY KEY, text TEXT NOT NULL, metadata TEXT NOT NULL, doc_type TEXT)"
+    )
+    conn.execute("CREATE INDEX chunks_doc_type ON chunks (doc_type)")
+    rows = (
+        # Loader metadata can hold non-JSON values (dates, coordinates); same as parse_cache
+        (pos, doc.page_content, json.dumps(doc.metadata, separators=(",", ":"), default=str),
+         doc.metadata.get("doc_type"))
+        for pos, doc in (
+            (pos, vector_store.docstore.search(doc_id))
+            for pos, doc_id in sorted(vector_store.index_to_docstore_id.items())
+        )
+    )
+    conn.executemany("INSERT INTO chunks VALUES (?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+    os.replace(tmp_path, path)
+    return path
+
+
+class _PositionIds(Mapping):
+    """index_to_docstore_id without the dict: FAISS row i maps to docstore id str(i)."""
+
+    def __init__(self, size):
+        self._size = size
+
+    def __getitem__(self, pos):
+        pos = int(pos)
+        if not 0 <= pos < self._size:
+            raise KeyError(pos)
+        return str(pos)
+
+    def __iter__(self):
+        return iter(range(self._size))
+
+    def __len__(self):
+        return self._size
+
+
+class SqliteDocstore(Docstore):
+    """
+    Read-only docstore over docstore.sqlite; one connection per thread.
+    The file must never be replaced in place (publish_index writes a new directory),
+    because connections are opened lazily by path.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        self._size = conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+        # Docstores published before the doc_type column are filtered on their metadata
+        self._has_doc_type = any(row[1] == "doc_type" for row in conn.execute("PRAGMA table_info(chunks)"))
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro&immutable=1", uri=True, check_same_thread=False)
+            conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+            self._local.conn = conn
+        return conn
+
+    def __len__(self):
+        return self._size
+
+    def search(self, search):
+        row = self._conn().execute(
+            "SELECT text, metadata FROM chunks WHERE pos = ?", (int(search),)
+        ).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(id=str(search), page_content=row[0], metadata=json.loads(row[1]))
+
+    def mget(self, positions, doc_type=None):
+        """Documents at the given FAISS positions (in that order), optionally only one doc_type."""
+        positions = [int(p) for p in positions]
+        if not positions:
+            return []
+        placeholders = ",".join("?" * len(positions))
+        sql = f"SELECT pos, text, metadata FROM chunks WHERE pos IN ({placeholders})"
+        params = list(positions)
+        if doc_type is not None and self._has_doc_type:
+            sql += " AND doc_type = ?"
+            params.append(doc_type)
+        found = {}
+        for pos, text, metadata in self._conn().execute(sql, params):
+            metadata = json.loads(metadata)
+            if doc_type is None or metadata.get("doc_type") == doc_type:
+                found[pos] = Document(id=str(pos), page_content=text, metadata=metadata)
+        return [found[p] for p in positions if p in found]
+
+    def delete(self, ids):
+        raise NotImplementedError("SqliteDocstore is read-only; re-run ingest_docs.py to change it")
+
+
+def load_compact_faiss(index_dir, embeddings):
+    """Load index.faiss plus the SQLite docstore, skipping the pickled InMemoryDocstore."""
+    import faiss
+    from langchain_community.vectorstores import FAISS
+
+    index_path = os.path.join(index_dir, "index.faiss")
+    # IO_FLAG_MMAP only maps IVF inverted lists; the IndexFlatL2 built by
+    # FAISS.from_documents needs IO_FLAG_MMAP_IFC (faiss >= 1.8) to map its vectors
+    mmap_flag = getattr(faiss, "IO_FLAG_MMAP_IFC", None)
+    index = None
+    if mmap_flag is not None:
+        try:
+            index = faiss.read_index(index_path, mmap_flag | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            pass
+    if index is None:
+        # Older faiss: the vectors are read into this process's heap
+        index = faiss.read_index(index_path)
+    docstore = SqliteDocstore(os.path.join(index_dir, DOCSTORE_FILE))
+    if len(docstore) != index.ntotal:
+        raise ValueError(
+            f"{DOCSTORE_FILE} has {len(docstore)} chunks but index.faiss has {index.ntotal} vectors; "
+            "re-run ingest_docs.py"
+        )
+    return FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=_PositionIds(index.ntotal),
+    )
+
+
+def search_by_doc_type(store, query, k, doc_type, fetch_k=300):
+    """
+    FAISS.similarity_search(query, k, filter={"doc_type": ...}, fetch_k) for a store
+    loaded by load_compact_faiss: same candidates and ranking, but the fetch_k
+    candidates are read and filtered with one SQLite query instead of fetch_k lookups.
+    """
+    import faiss
+    import numpy as np
+
+    vector = np.asarray([store.embedding_function.embed_query(query)], dtype=np.float32)
+    if store._normalize_L2:
+        faiss.normalize_L2(vector)
+    _, indices = store.index.search(vector, min(fetch_k, store.index.ntotal))
+    positions = [int(i) for i in indices[0] if i != -1]
+    return store.docstore.mget(positions, doc_type=doc_type)[:k]
@@ -0,0 +1,93 @@
+"""
+Micro-batched query embeddings
+
+Under concurrent load every rag_tool call embeds its own query with a separate
+Ollama request. BatchingEmbeddings wraps any LangChain Embeddings and funnels
+embed_query calls through one dispatcher thread: queries that arrive within
+max_wait_ms of the first waiting query (up to max_batch_size) are embedded with
+a single embed_documents call and the vectors are handed back to each caller.
+
+    embeddings = BatchingEmbeddings(OllamaEmbeddings(...), max_batch_size=16, max_wait_ms=5)
+
+stats() reports batch sizes and queue waits for /health.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+
+class BatchingEmbeddings(Embeddings):
+    def __init__(self, inner: Embeddings, max_batch_size: int = 16, max_wait_ms: float = 5.0):
+        self.inner = inner
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._queries = 0
+        self._max_batch_seen = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        threading.Thread(target=self._dispatch, daemon=True, name="embed-batcher").start()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        # Document batches are already batched by the caller
+        return self.inner.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        future = Future()
+        self._queue.put((text, time.perf_counter(), future))
+        return future.result()
+
+    def _dispatch(self):
+        while True:
+            batch = [self._queue.get()]
+            try:
+                self._run_batch(batch)
+            except Exception as e:
+                # Never leave a caller waiting, and keep the dispatcher alive for the next batch
+                print(f"[Embed] Batch of {len(batch)} failed: {type(e).__name__}: {e}")
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _run_batch(self, batch):
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        started = time.perf_counter()
+        vectors = self.inner.embed_documents([text for text, _, _ in batch])
+        if len(vectors) != len(batch):
+            raise ValueError(f"Embedder returned {len(vectors)} vectors for {len(batch)} queries")
+        for (_, _, future), vector in zip(batch, vectors):
+            future.set_result(vector)
+
+        waits = [started - enqueued for _, enqueued, _ in batch]
+        with self._lock:
+            self._batches += 1
+            self._queries += len(batch)
+            self._max_batch_seen = max(self._max_batch_seen, len(batch))
+            self._wait_total += sum(waits)
+            self._wait_max = max(self._wait_max, max(waits))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "batches": self._batches,
+                "queries": self._queries,
+                "avg_batch_size": round(self._queries / self._batches, 2) if self._batches else 0,
+                "max_batch_size": self._max_batch_seen,
+                "avg_queue_wait_ms": round(self._wait_total / self._queries * 1000, 2) if self._queries else 0,
+                "max_queue_wait_ms": round(self._wait_max * 1000, 2),
+            }
@@ -1,38 +1,94 @@
 import os
-from langchain_ollama import OllamaEmbeddings
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import FAISS
 from langchain_community.document_loaders import (
     PyPDFLoader,
     Docx2txtLoader,
     TextLoader,
+    UnstructuredPDFLoader,
+    UnstructuredImageLoader,
+    UnstructuredHTMLLoader,
+    UnstructuredEmailLoader,
+    UnstructuredFileLoader,
 )
 from dotenv import load_dotenv
+from backends import get_embeddings
+from compact_docstore import publish_index, DOCSTORE_FILE
+from parse_cache import ParseCache
+from chunking import chunk_documents, chunk_report, print_chunk_report
 
 load_dotenv()
 
+def load_text(file_path):
+    # Try utf-8 first, then fall back to latin-1
+    try:
+        return TextLoader(file_path, encoding="utf-8").load()
+    except UnicodeDecodeError:
+        print(f"   ⚠️  UTF-8 failed for {os.path.basename(file_path)}, retrying with latin-1")
+        return TextLoader(file_path, encoding="latin-1").load()
+
+def load_pdf(file_path):
+    docs = PyPDFLoader(file_path).load()
+    missing = [i for i, doc in enumerate(docs) if not doc.page_content.strip()]
+    if not missing:
+        return docs
+    # Pages without a text layer are scans (a whole scanned PDF, or scans appended to a text PDF)
+    print(f"   🔎 {len(missing)} of {len(docs)} page(s) in {os.path.basename(file_path)} have no text layer, running OCR")
+    ocr_docs = UnstructuredPDFLoader(file_path, mode="paged", strategy="ocr_only").load()
+    if len(missing) == len(docs):
+        return ocr_docs
+    ocr_pages = {doc.metadata.get("page_number", 0) - 1: doc.page_content for doc in ocr_docs}
+    for i in missing:
+        docs[i].page_content = ocr_pages.get(i, "")
+    return docs
+
+def load_image(file_path):
+    return UnstructuredImageLoader(file_path, mode="paged").load()
+
+def load_html(file_path):
+    return UnstructuredHTMLLoader(file_path).load()
+
+def load_email(file_path):
+    return UnstructuredEmailLoader(file_path).load()
+
+def load_outlook(file_path):
+    # unstructured picks partition_msg from the file type
+    return UnstructuredFileLoader(file_path).load()
+
 LOADERS = {
-    ".pdf": PyPDFLoader,
-    ".docx": Docx2txtLoader,
-    ".txt": TextLoader,
+    ".pdf": load_pdf,
+    ".docx": lambda fp: Docx2txtLoader(fp).load(),
+    ".txt": load_text,
+    ".png": load_image,
+    ".jpg": load_image,
+    ".jpeg": load_image,
+    ".tif": load_image,
+    ".tiff": load_image,
+    ".bmp": load_image,
+    ".html": load_html,
+    ".htm": load_html,
+    ".eml": load_email,
+    ".msg": load_outlook,
 }
 
-def load_document(file_path):
-    """Pick the right loader based on file extension."""
+def load_document(file_path, cache=None):
+    """Pick the right loader based on file extension, reusing cached text for unchanged files."""
     ext = os.path.splitext(file_path)[1].lower()
-    loader_cls = LOADERS.get(ext)
-    if loader_cls is None:
+    loader = LOADERS.get(ext)
+    if loader is None:
         print(f"   ⚠️  Skipping unsupported file type: {ext}")
         return []
     try:
-        if loader_cls is TextLoader:
-            # Try utf-8 first, then fall back to latin-1
-            try:
-                return TextLoader(file_path, encoding="utf-8").load()
-            except UnicodeDecodeError:
-                print(f"   ⚠️  UTF-8 failed for {os.path.basename(file_path)}, retrying with latin-1")
-                return TextLoader(file_path, encoding="latin-1").load()
-        return loader_cls(file_path).load()
+        key = None
+        if cache is not None:
+            key = cache.key(file_path, ext.lstrip("."))
+            docs = cache.get(key, file_path)
+            if docs is not None:
+                return docs
+        docs = loader(file_path)
+        if key is not None:
+            # Cache empty results too, so scans where OCR finds no text are not re-OCRed every run
+            cache.put(key, docs)
+        return docs
     except Exception as e:
         print(f"   ❌ Error loading {os.path.basename(file_path)}: {e}")
         return []
@@ -41,6 +97,9 @@ def main():
     base_dir = os.path.dirname(os.path.abspath(__file__))
     docs_dir = os.path.abspath(os.path.join(base_dir, "..", "embeddings", "docs"))
     index_dir = os.path.join(base_dir, "faiss_index")
+    cache = None
+    if os.getenv("PARSE_CACHE", "1") == "1":
+        cache = ParseCache(os.getenv("PARSE_CACHE_DIR", os.path.join(base_dir, "parse_cache")))
 
     print(f"🔍 Scanning {docs_dir} for new documents...")
 
@@ -63,7 +122,7 @@ def main():
     all_docs = []
     for fp in file_paths:
         print(f"   Loading: {os.path.basename(fp)}")
-        docs = load_document(fp)
+        docs = load_document(fp, cache)
 
         # Tag each doc with its folder name as doc_type (e.g. invoices, reviews, policies, threads)
         parent_folder = os.path.basename(os.path.dirname(fp)).lower()
@@ -73,23 +132,28 @@ def main():
         all_docs.extend(docs)
         print(f"   ✔ Loaded {len(docs)} page(s) [type: {parent_folder}]")
 
+    if cache is not None:
+        print(f"   ♻️  Parse cache: {cache.stats['hits']} reused, {cache.stats['misses']} parsed")
+
     if not all_docs:
         print("⚠️  No content could be extracted from the documents.")
         return
 
     print(f"\n✂️  Chunking {len(all_docs)} pages...")
-    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-    chunks = splitter.split_documents(all_docs)
+    chunks = chunk_documents(all_docs)
     print(f"   Created {len(chunks)} searchable chunks.")
+    print_chunk_report(chunk_report(all_docs, chunks))
 
-    embed_model = os.getenv("OLLAMA_EMBEDDING_MODEL", "qwen3-embedding:4b")
-    print(f"\n🧠 Generating AI embeddings via Ollama ({embed_model})...")
-    embedding = OllamaEmbeddings(model=embed_model)
+    embedding = get_embeddings()
+    embed_model = getattr(embedding, "model", type(embedding).__name__)
+    print(f"\n🧠 Generating AI embeddings ({embed_model})...")
 
     vector_store = FAISS.from_documents(chunks, embedding)
 
     print(f"\n💾 Saving vector database to {index_dir}...")
-    vector_store.save_local(index_dir)
+    version = publish_index(vector_store, index_dir, keep=int(os.getenv("INDEX_KEEP_VERSIONS", "0")))
+    docstore_path = os.path.join(index_dir, version, DOCSTORE_FILE)
+    print(f"   Published version {version}, compact docstore {os.path.getsize(docstore_path) / 1024:.0f} KB")
     print("✅ DONE! The FAISS database is ready. You can now ask questions about these documents in your Dashboard!")
 
 if __name__ == "__main__":
@@ -0,0 +1,187 @@
+"""
+Load generator for chatbot_server.py
+
+Drives POST /chat and/or POST /chat/stream at a fixed concurrency and reports
+throughput, latency percentiles (and time-to-first-token for streams) and
+error rates. Exits non-zero when --max-error-rate or --max-p95-ms is exceeded,
+so it can gate CI.
+
+Offline run (no Ollama / Gmail needed):
+    cd backend/rag
+    EMBEDDING_BACKEND=fake python ingest_docs.py
+    LLM_BACKEND=fake EMBEDDING_BACKEND=fake GMAIL_BACKEND=fake python chatbot_server.py
+    python load_test.py --concurrency 16 --requests 400 --endpoint both
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_QUERIES = [
+    "List all unpaid invoices and their due dates",
+    "What is our total expenditure on invoices?",
+    "Summarise the negative review trends",
+    "What does the payment processing policy say about late payments?",
+    "Summarise the support ticket threads",
+    "Check my inbox for invoices",
+    "Do I have any important emails?",
+    "Show me my email from laura",
+    "Draft an email to the vendor about the overdue invoice",
+    "Hello, what can you do?",
+]
+
+
+def percentile(values, pct):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    k = (len(values) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def post(url, payload, timeout):
+    req = urllib.request.Request(
+        url,
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    return urllib.request.urlopen(req, timeout=timeout)
+
+
+def run_chat(base_url, payload, timeout):
+    """Returns (latency_s, ttft_s, error)."""
+    start = time.perf_counter()
+    with post(f"{base_url}/chat", payload, timeout) as resp:
+        data = json.loads(resp.read())
+    latency = time.perf_counter() - start
+    if "answer" not in data:
+        return latency, None, data.get("error", "missing answer")
+    return latency, latency, None
+
+
+def run_stream(base_url, payload, timeout):
+    start = time.perf_counter()
+    ttft = None
+    error = None
+    done = False
+    with post(f"{base_url}/chat/stream", payload, timeout) as resp:
+        for raw in resp:
+            line = raw.decode("utf-8").strip()
+            if not line.startswith("data: "):
+                continue
+            event = json.loads(line[6:])
+            if "token" in event and ttft is None:
+                ttft = time.perf_counter() - start
+            if "error" in event:
+                error = event["error"]
+            if event.get("done"):
+                done = True
+    if not done and error is None:
+        error = "stream ended without done event"
+    return time.perf_counter() - start, ttft, error
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.ttfts = []
+        self.errors = {}
+        self.ok = 0
+
+    def record(self, latency, ttft, error):
+        with self.lock:
+            if error:
+                self.errors[error] = self.errors.get(error, 0) + 1
+                return
+            self.ok += 1
+            self.latencies.append(latency)
+            if ttft is not None:
+                self.ttfts.append(ttft)
+
+    @property
+    def total(self):
+        return self.ok + sum(self.errors.values())
+
+
+def drive(name, fn, args, queries):
+    stats = Stats()
+
+    def one(i):
+        thread_id = args.thread_id or f"load-{name}-{i}"
+        payload = {"query": queries[i % len(queries)], "thread_id": thread_id}
+        try:
+            stats.record(*fn(args.url, payload, args.timeout))
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            stats.record(None, None, type(e).__name__)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(one, range(args.requests)))
+    elapsed = time.perf_counter() - start
+
+    error_rate = 1 - stats.ok / stats.total if stats.total else 0.0
+    p95_ms = percentile(stats.latencies, 95) * 1000
+
+    print(f"\n[{name}] {stats.total} requests, concurrency {args.concurrency}, {elapsed:.1f}s")
+    print(f"   throughput : {stats.ok / elapsed:.2f} req/s")
+    print("   latency ms : " + "  ".join(
+        f"p{p}={percentile(stats.latencies, p) * 1000:.0f}" for p in (50, 90, 95, 99)
+    ))
+    if name == "stream" and stats.ttfts:
+        print("   ttft ms    : " + "  ".join(
+            f"p{p}={percentile(stats.ttfts, p) * 1000:.0f}" for p in (50, 95)
+        ))
+    print(f"   errors     : {error_rate:.2%}" + (f" {stats.errors}" if stats.errors else ""))
+
+    return stats.ok, error_rate, p95_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:5001")
+    parser.add_argument("--endpoint", choices=["chat", "stream", "both"], default="both")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--thread-id", default=None,
+                        help="send every request on this thread_id (like the Node backend's \"1\"); "
+                             "default is a unique thread per request")
+    parser.add_argument("--queries", help="file with one query per line (default: built-in mix)")
+    parser.add_argument("--max-error-rate", type=float, default=None)
+    parser.add_argument("--max-p95-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        with open(args.queries, encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    endpoints = {"chat": run_chat, "stream": run_stream}
+    selected = ["chat", "stream"] if args.endpoint == "both" else [args.endpoint]
+
+    failed = False
+    for name in selected:
+        ok, error_rate, p95_ms = drive(name, endpoints[name], args, queries)
+        if ok == 0:
+            # No latencies to judge (p95 is NaN), so never let a fully failed run pass
+            print(f"❌ [{name}] no successful requests")
+            failed = True
+        if args.max_error_rate is not None and error_rate > args.max_error_rate:
+            print(f"❌ [{name}] error rate {error_rate:.2%} > {args.max_error_rate:.2%}")
+            failed = True
+        if args.max_p95_ms is not None and p95_ms > args.max_p95_ms:
+            print(f"❌ [{name}] p95 {p95_ms:.0f}ms > {args.max_p95_ms:.0f}ms")
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
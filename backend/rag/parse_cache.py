@@ -0,0 +1,61 @@
+"""
+On-disk cache of extracted document text for ingest_docs.py
+
+Parsing (and especially OCR) is the slowest part of ingestion. Each file's
+extracted pages are stored as JSON under a key made of the SHA-256 of the file
+contents plus the loader that produced them, so re-running ingestion skips
+parsing for every unchanged file, even if it was renamed or moved.
+Bump PARSER_VERSION when loader settings change to invalidate old entries.
+"""
+import hashlib
+import json
+import os
+
+from langchain_core.documents import Document
+
+PARSER_VERSION = "2"
+
+
+class ParseCache:
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self.stats = {"hits": 0, "misses": 0}
+
+    @staticmethod
+    def key(file_path, loader_name):
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return f"{digest.hexdigest()}-{loader_name}-v{PARSER_VERSION}"
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".json")
+
+    def get(self, key, file_path):
+        """Cached pages for key, with 'source' pointing at the current file_path; None on a miss ([] is a hit)."""
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        docs = []
+        for entry in entries:
+            metadata = entry["metadata"]
+            if "source" in metadata:
+                metadata["source"] = file_path
+            docs.append(Document(page_content=entry["page_content"], metadata=metadata))
+        return docs
+
+    def put(self, key, docs):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entries = [{"page_content": d.page_content, "metadata": d.metadata} for d in docs]
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            # Unstructured metadata can hold non-JSON values (dates, coordinates)
+            json.dump(entries, f, default=str)
+        os.replace(tmp_path, path)
@@ -0,0 +1,200 @@
+"""
+Keyword routing engine for chatbot.py
+
+All routing keyword tables and regexes are compiled once at import time into
+a single matcher. One scan of the user message yields doc_type scores and
+email / RAG intent. Compose intent and the sender name need their own patterns,
+so Route computes them only when they are read (chat_node needs compose intent
+only when both intents match, detect_doc_type needs neither).
+
+Keywords match at the start of a word and may be followed by more letters
+("bill" matches "bills" and "billing", but "mail" no longer matches inside
+"hotmail" and "sop" no longer matches inside "isopropyl").
+"""
+import re
+from functools import cached_property
+
+# Keywords that map a query to a specific doc_type folder
+DOC_TYPE_KEYWORDS = {
+    "invoices": ["invoice", "invoices", "expenditure", "expenditures", "billing",
+                 "bill", "bills", "receipt", "receipts", "payment", "payments",
+                 "amount", "total amount", "due date", "vendor", "unpaid", "overdue"],
+    "reviews":  ["review", "reviews", "feedback", "rating", "ratings", "testimonial",
+                 "testimonials", "sentiment", "customer feedback", "negative review",
+                 "positive review", "complaint", "complaints"],
+    "policies": ["policy", "policies", "sop", "procedure", "guideline", "guidelines",
+                 "compliance", "regulation"],
+    "threads":  ["thread", "threads", "conversation", "email thread", "discussion",
+                 "correspondence", "support ticket", "ticket"],
+}
+
+EMAIL_KEYWORDS = ["email", "emails", "inbox", "mail", "mails", "gmail",
+                  "unread", "recent emails", "check my email", "show me my email",
+                  "vendor email", "client email",
+                  "meeting invite", "correspondence"]
+
+RAG_KEYWORDS = ["invoice", "invoices", "expenditure", "expenditures", "billing",
+                "bill", "bills", "receipt", "receipts", "payment", "payments",
+                "review", "reviews", "feedback", "rating", "ratings",
+                "complaint", "complaints", "sentiment", "testimonial",
+                "policy", "policies", "sop", "procedure", "guideline",
+                "report", "contract", "proposal", "feature", "changelog",
+                "document", "documents", "docs", "from the docs",
+                "support ticket", "thread", "threads"]
+
+# Email-compose intent: "draft email", "reply email", "write email", "send email".
+# These mean the user wants to CREATE an email, not SEARCH Gmail
+COMPOSE_PATTERNS = [
+    r"(?:draft|write|compose|create|send|reply|respond|prepare|generate)\s+(?:a\s+|an\s+|the\s+)?(?:reply\s+)?(?:email|mail|response)",
+    r"(?:reply|respond)\s+(?:to\s+)?(?:this|that|the|his|her)",
+]
+
+# Words that signal the end of a sender name
+SENDER_BOUNDARY_WORDS = (
+    "regarding|about|concerning|for|with|on|that|which|and|or|"
+    "invoice|invoices|payment|receipt|bill|report|review|policy|"
+    "subject|today|yesterday|last|this|please|can|could|check"
+)
+# Capture one or two words after from/by/sent by, but stop at boundary words
+SENDER_PATTERN = rf"(?:from|by|sent by)\s+([a-zA-Z0-9_.+-]+(?:\s+(?!{SENDER_BOUNDARY_WORDS})[a-zA-Z0-9_.+-]+)?)"
+SENDER_STOP_WORDS = {"me", "my", "the", "a", "an", "inbox", "email", "mail"}
+
+NAME_PATTERNS = [
+    r"(?:my name is|i'm|i am|call me|this is)\s+([A-Z][a-z]+)",
+    r"(?:name's)\s+([A-Z][a-z]+)",
+]
+
+
+def _trie_pattern(words):
+    """
+    Build a prefix-factored alternation (e.g. "bill(?:ing|s)?") so the regex engine
+    walks a trie instead of trying every keyword at each position.
+    Optional tails are greedy, so the longest keyword at a position wins.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node):
+        ends_here = "" in node
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return "(?:" + body + ")?" if ends_here else body
+
+    return build(trie)
+
+
+class Route:
+    """Result of KeywordRouter.route; is_compose_intent and sender are evaluated on first access."""
+
+    def __init__(self, router, text, doc_type_scores, doc_type, is_email_query, is_rag_query):
+        self._router = router
+        self._text = text
+        self.doc_type_scores = doc_type_scores
+        self.doc_type = doc_type
+        self.is_email_query = is_email_query
+        self.is_rag_query = is_rag_query
+
+    @cached_property
+    def is_compose_intent(self):
+        return self._router.is_compose_intent(self._text)
+
+    @cached_property
+    def sender(self):
+        return self._router.sender(self._text)
+
+
+class KeywordRouter:
+    """Compiles every keyword table into one alternation and routes messages in one scan."""
+
+    def __init__(self, doc_type_keywords=DOC_TYPE_KEYWORDS,
+                 email_keywords=EMAIL_KEYWORDS, rag_keywords=RAG_KEYWORDS):
+        self.doc_types = list(doc_type_keywords)
+
+        # keyword -> set of labels ("email", "rag", or a doc_type) it votes for
+        labels = {}
+        for doc_type, keywords in doc_type_keywords.items():
+            for kw in keywords:
+                labels.setdefault(kw, set()).add(doc_type)
+        for kw in email_keywords:
+            labels.setdefault(kw, set()).add("email")
+        for kw in rag_keywords:
+            labels.setdefault(kw, set()).add("rag")
+
+        # A match at a word start is the longest keyword there. Every shorter keyword
+        # that is a prefix of it matches at the same spot, so precompute them instead
+        # of rescanning.
+        keywords = sorted(labels)
+        self._implied = {
+            kw: [other for other in keywords if kw.startswith(other)]
+            for kw in keywords
+        }
+        self._labels = labels
+        # Zero-width lookahead so keywords starting inside a longer match are still seen
+        self._keyword_re = re.compile(rf"\b(?=({_trie_pattern(keywords)}))")
+        self._compose_re = re.compile(r"\b(?:" + "|".join(f"(?:{p})" for p in COMPOSE_PATTERNS) + ")", re.IGNORECASE)
+        self._sender_re = re.compile(SENDER_PATTERN, re.IGNORECASE)
+        self._name_re = re.compile("|".join(f"(?:{p})" for p in NAME_PATTERNS), re.IGNORECASE)
+
+    def keyword_hits(self, text: str):
+        """Return the set of distinct keywords present in an already-lowercased text."""
+        hits = set()
+        for match in self._keyword_re.finditer(text):
+            hits.update(self._implied[match.group(1)])
+        return hits
+
+    def _scan(self, text: str):
+        """Single keyword pass: (doc_type scores, is_email_query, is_rag_query)."""
+        hits = self.keyword_hits(text)
+
+        scores = {}
+        is_email_query = is_rag_query = False
+        for kw in hits:
+            for label in self._labels[kw]:
+                if label == "email":
+                    is_email_query = True
+                elif label == "rag":
+                    is_rag_query = True
+                else:
+                    scores[label] = scores.get(label, 0) + 1
+
+        # Keep DOC_TYPE_KEYWORDS order so ties resolve the same way as before
+        scores = {dt: scores[dt] for dt in self.doc_types if dt in scores}
+        return scores, is_email_query, is_rag_query
+
+    def route(self, text: str) -> Route:
+        text = text.lower()
+        scores, is_email_query, is_rag_query = self._scan(text)
+        return Route(self, text, scores, max(scores, key=scores.get) if scores else None,
+                     is_email_query, is_rag_query)
+
+    def doc_type(self, text: str):
+        """Best-scoring doc_type for text, from the keyword pass only."""
+        scores, _, _ = self._scan(text.lower())
+        return max(scores, key=scores.get) if scores else None
+
+    def is_compose_intent(self, text: str):
+        return self._compose_re.search(text) is not None
+
+    def sender(self, text: str):
+        """Extract sender/person name from queries like 'email from ommi'."""
+        match = self._sender_re.search(text)
+        if match:
+            name = match.group(1).strip()
+            if name.lower() not in SENDER_STOP_WORDS:
+                return name
+        return None
+
+    def user_name(self, text: str):
+        match = self._name_re.search(text)
+        if match:
+            return next(g for g in match.groups() if g).title()
+        return None
+
+
+router = KeywordRouter()
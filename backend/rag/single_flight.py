@@ -0,0 +1,72 @@
+"""
+Single-flight request coalescing for chatbot_server.py
+
+When several identical requests are in flight at the same time, only the
+first one (the "leader") runs the LangGraph pipeline. Everyone else waits
+for the leader and receives the same answer (or the same error).
+"""
+import threading
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase and collapse whitespace so trivially different queries coalesce."""
+    return " ".join(query.split()).lower()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Deduplicate concurrent calls that share the same key."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.stats = {"executed": 0, "coalesced": 0}
+
+    def do(self, key, fn):
+        """
+        Run fn() once per key among concurrent callers.
+        Returns (result, shared) where shared is True for callers that
+        piggybacked on another request's execution.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.stats["coalesced"] += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.stats["executed"] += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            # Forget the key before waking followers so that a request arriving
+            # after completion starts a fresh execution instead of reusing a stale one
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+        return call.result, False
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
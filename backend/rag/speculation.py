@@ -0,0 +1,88 @@
+"""
+Speculative tool execution for chat_node
+
+When routing is ambiguous, chat_node starts the expensive backend calls a tool
+is likely to need (FAISS retrieval, Gmail search) in a thread pool while the
+routing LLM call is still running. If the model then calls the tool with the
+same arguments, the tool takes the speculative result instead of recomputing it.
+
+Results are keyed by everything they depend on (tool, arguments, corpus version),
+so a hit returns exactly what the tool would have computed. Speculations nobody
+claims are cancelled if not yet started and otherwise dropped after ttl seconds.
+
+shadow() records a key without running anything, so the hit rate of a case
+that is not speculated can still be measured (stats["cases"]) before enabling it.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Speculator:
+    def __init__(self, max_workers=4, ttl=60.0):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="speculate")
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._shadows = {}
+        self.ttl = ttl
+        self.stats = {"started": 0, "hits": 0, "discarded": 0, "cases": {}}
+
+    def _case(self, case):
+        return self.stats["cases"].setdefault(case, {"started": 0, "hits": 0, "shadowed": 0, "would_hit": 0})
+
+    def start(self, key, fn, case="default"):
+        """Run fn() in the background unless a speculation for key is already pending."""
+        with self._lock:
+            self._evict_expired()
+            if key in self._pending:
+                return
+            self._pending[key] = (time.monotonic(), self._pool.submit(fn), case)
+            self.stats["started"] += 1
+            self._case(case)["started"] += 1
+
+    def shadow(self, key, case):
+        """Remember key without running anything; a later take() of it counts as would_hit."""
+        with self._lock:
+            self._evict_expired()
+            self._shadows[key] = (time.monotonic(), case)
+            self._case(case)["shadowed"] += 1
+
+    def take(self, key):
+        """
+        Claim the speculative result for key. Returns (True, result) on a hit,
+        (False, None) if nothing usable was speculated (including speculative errors,
+        so the caller recomputes and surfaces its own error). Waits only for a
+        speculation that is already running; one still queued is cancelled instead.
+        """
+        with self._lock:
+            entry = self._pending.pop(key, None)
+            shadow = self._shadows.pop(key, None)
+            if shadow is not None:
+                self._case(shadow[1])["would_hit"] += 1
+        if entry is None:
+            return False, None
+        future, case = entry[1], entry[2]
+        if not future.running() and future.cancel():
+            # Still queued behind other speculations; computing inline is faster than waiting
+            with self._lock:
+                self.stats["discarded"] += 1
+            return False, None
+        try:
+            result = future.result()
+        except Exception:
+            return False, None
+        with self._lock:
+            self.stats["hits"] += 1
+            self._case(case)["hits"] += 1
+        return True, result
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        for key, (started, future, _) in list(self._pending.items()):
+            if now - started > self.ttl:
+                future.cancel()
+                del self._pending[key]
+                self.stats["discarded"] += 1
+        for key, (started, _) in list(self._shadows.items()):
+            if now - started > self.ttl:
+                del self._shadows[key]
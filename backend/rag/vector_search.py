@@ -0,0 +1,180 @@
+"""
+In-memory matrix search over the SQLite export (export_to_sqlite.py)
+
+The Node retrieval path used to read every row of `embeddings`, JSON.parse each
+vector and score it in JavaScript for every query. VectorMatrix parses the
+export once into a contiguous float32 matrix of L2-normalised rows, so a batch
+of queries is scored with one matrix multiply plus argpartition. Only the
+top-k chunk texts are then read back from SQLite.
+
+The export is reloaded when the embeddings table changes (checked at most every
+reload_interval seconds); searches in flight keep using the previous snapshot.
+"""
+import json
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+
+class _Snapshot:
+    def __init__(self, matrix, chunk_ids, chunk_indexes, sources, doc_types):
+        self.matrix = matrix
+        self.chunk_ids = chunk_ids
+        self.chunk_indexes = chunk_indexes
+        self.sources = sources
+        self.doc_types = doc_types
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class VectorMatrix:
+    def __init__(self, db_path, reload_interval=2.0):
+        self.db_path = db_path
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._signature = None
+        self._checked_at = 0.0
+
+    def _export_signature(self):
+        """
+        Identifies the current export. export_to_sqlite.py re-inserts every row, so the
+        AUTOINCREMENT ids move on each export, while writes by the Node app (queries,
+        feedback, users) touch other tables and leave this unchanged.
+        """
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT MAX(id), COUNT(*) FROM embeddings").fetchone()
+        finally:
+            conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+
+    def _load(self):
+        conn = self._connect()
+        try:
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(document_chunks)")}
+            doc_type_col = "dc.doc_type" if "doc_type" in columns else "NULL"
+            rows = conn.execute(
+                f"""SELECT e.chunk_id, e.embedding, dc.chunk_index, dc.source_file, {doc_type_col}
+                    FROM embeddings e
+                    JOIN document_chunks dc ON dc.id = e.chunk_id
+                    ORDER BY e.id"""
+            ).fetchall()
+        finally:
+            conn.close()
+
+        vectors, chunk_ids, chunk_indexes, sources, doc_types = [], [], [], [], []
+        for chunk_id, embedding, chunk_index, source_file, doc_type in rows:
+            try:
+                raw = embedding.decode("utf-8") if isinstance(embedding, bytes) else embedding
+                vectors.append(json.loads(raw))
+            except (ValueError, UnicodeDecodeError):
+                print(f"[Search] Skipping malformed embedding chunk_id={chunk_id}")
+                continue
+            chunk_ids.append(chunk_id)
+            chunk_indexes.append(chunk_index)
+            sources.append(source_file or "")
+            doc_types.append(doc_type or "")
+
+        if vectors:
+            matrix = _normalize(np.asarray(vectors, dtype=np.float32))
+        else:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+        return _Snapshot(
+            matrix=np.ascontiguousarray(matrix),
+            chunk_ids=np.asarray(chunk_ids, dtype=np.int64),
+            chunk_indexes=chunk_indexes,
+            sources=np.asarray(sources, dtype=object),
+            doc_types=np.asarray(doc_types, dtype=object),
+        )
+
+    def snapshot(self):
+        """Current matrix, reloading first if the export changed since the last check."""
+        now = time.monotonic()
+        if self._snapshot is not None and now - self._checked_at < self.reload_interval:
+            return self._snapshot
+        with self._lock:
+            if self._snapshot is not None and now - self._checked_at < self.reload_interval:
+                return self._snapshot
+            self._checked_at = now
+            signature = self._export_signature()
+            if self._snapshot is None or signature != self._signature:
+                self._snapshot = self._load()
+                self._signature = signature
+                print(f"[Search] Loaded {len(self._snapshot.chunk_ids)} embeddings from {self.db_path}")
+            return self._snapshot
+
+    def search(self, queries, top_k=5, doc_type=None, source=None):
+        """
+        Top-k chunks by cosine similarity for each query vector.
+        Returns one list of results per query.
+        """
+        if top_k < 1:
+            raise ValueError("top_k must be at least 1")
+        snap = self.snapshot()
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if snap.matrix.shape[0] == 0:
+            return [[] for _ in range(len(queries))]
+        if queries.shape[1] != snap.matrix.shape[1]:
+            raise ValueError(f"Query dimension {queries.shape[1]} does not match index dimension {snap.matrix.shape[1]}")
+
+        candidates = np.arange(snap.matrix.shape[0])
+        if doc_type or source:
+            mask = np.ones(len(candidates), dtype=bool)
+            if doc_type:
+                mask &= snap.doc_types == doc_type
+            if source:
+                needle = source.lower()
+                mask &= np.fromiter((needle in s.lower() for s in snap.sources), dtype=bool, count=len(mask))
+            candidates = candidates[mask]
+            if len(candidates) == 0:
+                return [[] for _ in range(len(queries))]
+            matrix = snap.matrix[candidates]
+        else:
+            matrix = snap.matrix
+
+        scores = _normalize(queries) @ matrix.T
+        k = min(top_k, matrix.shape[0])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        rows = candidates[top]
+        texts = self._chunk_texts({int(snap.chunk_ids[r]) for r in rows.ravel()})
+        results = []
+        for q_rows, q_scores in zip(rows, top_scores):
+            results.append([
+                {
+                    "chunk_id": int(snap.chunk_ids[r]),
+                    "chunk_index": snap.chunk_indexes[r],
+                    "chunk_text": texts.get(int(snap.chunk_ids[r]), ""),
+                    "source_file": snap.sources[r],
+                    "doc_type": snap.doc_types[r] or None,
+                    "similarity_score": float(score),
+                }
+                for r, score in zip(q_rows, q_scores)
+            ])
+        return results
+
+    def _chunk_texts(self, chunk_ids):
+        if not chunk_ids:
+            return {}
+        conn = self._connect()
+        try:
+            placeholders = ",".join("?" * len(chunk_ids))
+            return dict(conn.execute(
+                f"SELECT id, chunk_text FROM document_chunks WHERE id IN ({placeholders})",
+                list(chunk_ids),
+            ).fetchall())
+        finally:
+            conn.close()
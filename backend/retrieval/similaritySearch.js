@@ -2,18 +2,74 @@ const db = require("../db/sqlite");
 const { cosineSimilarity } = require("../utils/cosineSimilarity");
 const logger = require("../utils/logger");
 
+const CHATBOT_API = process.env.CHATBOT_API_URL || "http://127.0.0.1:5001";
+const REMOTE_SEARCH_TIMEOUT_MS = Number(process.env.REMOTE_SEARCH_TIMEOUT_MS) || 2000;
+
+/**
+ * Search via the Python server's /search endpoint, which keeps the exported
+ * embeddings in a normalised NumPy matrix instead of re-parsing every row.
+ *
+ * @param {number[]} queryEmbedding - Query embedding vector
+ * @param {number}   topK          - Number of top results to return
+ * @param {object}   filters       - Optional { doc_type, source }
+ * @returns {Promise<object[]|null>} - Top-K chunks, or null if the server is unavailable
+ */
+const remoteSearch = async (queryEmbedding, topK, filters = {}) => {
+  try {
+    const response = await fetch(`${CHATBOT_API}/search`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ embedding: queryEmbedding, top_k: topK, ...filters }),
+      // A stalled Python server should not block the query; fall back to the local scan
+      signal: AbortSignal.timeout(REMOTE_SEARCH_TIMEOUT_MS),
+    });
+    const data = await response.json();
+    if (!response.ok) {
+      logger.warn(`Python /search failed (${response.status}): ${data.error}`);
+      return null;
+    }
+    return data.results;
+  } catch (error) {
+    logger.warn(`Python /search unreachable, falling back to local scan: ${error.message}`);
+    return null;
+  }
+};
+
 /**
  * Search for similar document chunks based on a query embedding vector.
  *
- * Reads all stored embeddings from SQLite (populated by export_to_sqlite.py),
- * computes cosine similarity against the query embedding, and returns the
- * top-K most similar chunks.
+ * Uses the Python /search endpoint when it is running. Otherwise reads all
+ * stored embeddings from SQLite (populated by export_to_sqlite.py), computes
+ * cosine similarity against the query embedding, and returns the top-K most
+ * similar chunks.
  *
  * @param {number[]} queryEmbedding - Query embedding vector (from Ollama)
  * @param {number}   topK          - Number of top results to return
+ * @param {object}   filters       - Optional { doc_type, source } (source is a case-insensitive substring of source_file)
  * @returns {Promise<object[]>}    - Top-K chunks with similarity scores
  */
-const similaritySearch = async (queryEmbedding, topK = 5) => {
+const similaritySearch = async (queryEmbedding, topK = 5, filters = {}) => {
+  const remote = await remoteSearch(queryEmbedding, topK, filters);
+  if (remote) {
+    logger.info(
+      `Similarity search (python): ${remote.length} results (top score: ${remote[0]?.similarity_score?.toFixed(4) ?? "N/A"})`
+    );
+    return remote;
+  }
+
+  // Same filters as the Python path, so a fallback never widens the search
+  const conditions = [];
+  const params = [];
+  if (filters.doc_type) {
+    conditions.push("dc.doc_type = ?");
+    params.push(filters.doc_type);
+  }
+  if (filters.source) {
+    conditions.push("instr(lower(dc.source_file), lower(?)) > 0");
+    params.push(filters.source);
+  }
+  const where = conditions.length ? `WHERE ${conditions.join(" AND ")}` : "";
+
   try {
     const rows = await new Promise((resolve, reject) => {
       db.all(
@@ -22,9 +78,12 @@ const similaritySearch = async (queryEmbedding, topK = 5) => {
                 e.embedding,
                 dc.chunk_text,
                 dc.chunk_index,
-                dc.source_file
+                dc.source_file,
+                dc.doc_type
          FROM embeddings e
-         JOIN document_chunks dc ON dc.id = e.chunk_id`,
+         JOIN document_chunks dc ON dc.id = e.chunk_id
+         ${where}`,
+        params,
         (err, rows) => {
           if (err) {
             logger.error("Error fetching embeddings:", err);
@@ -60,6 +119,7 @@ const similaritySearch = async (queryEmbedding, topK = 5) => {
           chunk_index: row.chunk_index,
           chunk_text: row.chunk_text,
           source_file: row.source_file,
+          doc_type: row.doc_type || null,
           similarity_score: score,
         };
       })